@@ -26,9 +26,18 @@
 # +----------------------------------------------------------------------------
 from distutils.core import Command
 import os
+import re
 import sys
 import unittest
 
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# Characters replaced by their representation in the test reports
+NON_PRINTABLE_CHARACTERS = re.compile(r'[^\x20-\x7f\t\n\r]')
+
 
 class test_command(Command):
     description = "Test PYLSTAR"
@@ -60,30 +69,27 @@ class test_command(Command):
             runner = unittest.TextTestRunner()
             runner.run(currentTestSuite)
         else:
-            # We execute the test suite
-            File = open(self.reportfile, 'w')
-            File.write('<?xml version="1.0" encoding="utf-8"?>\n')
-            reporter = XMLTestRunner(File)
+            # We execute the test suite and write its cleaned report at once
+            report = StringIO()
+            reporter = XMLTestRunner(report)
             reporter.run(currentTestSuite)
-            File.close()
 
-            self.cleanFile(self.reportfile)
+            with open(self.reportfile, 'wb') as fd:
+                fd.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+                fd.write(self.cleanData(report.getvalue()).encode('utf-8'))
 
     def cleanFile(self, filePath):
         """Clean the file to handle non-UTF8 bytes.
         """
 
-        aFile = open(filePath, 'r')
-        data = aFile.read()
-        aFile.close()
+        with open(filePath, 'rb') as fd:
+            data = fd.read().decode('utf-8')
 
-        cleanData = ""
-        for c in data:
-            if (0x1f < ord(c) < 0x80) or (ord(c) == 0x9) or (ord(c) == 0xa) or (ord(c) == 0xd):
-                cleanData += c
-            else:
-                cleanData += repr(c)
+        with open(filePath, 'wb') as fd:
+            fd.write(self.cleanData(data).encode('utf-8'))
+
+    def cleanData(self, data):
+        """Returns the specified data where non printable characters are replaced by their representation.
+        """
 
-        aFile = open(filePath, 'w')
-        aFile.write(cleanData)
-        aFile.close()
+        return NON_PRINTABLE_CHARACTERS.sub(lambda match: repr(match.group(0)), data)
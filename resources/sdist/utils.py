@@ -29,3 +29,9 @@ import os
 def opj(*args):
     path = os.path.join(*args)
     return os.path.normpath(path)
+
+
+def read_file(*args):
+    """Returns the content of the file located by the specified path components."""
+    with open(opj(*args), 'rt') as fd:
+        return fd.read()
@@ -32,15 +32,13 @@ from setuptools import setup, find_packages
 sys.path.insert(0, 'src/')
 from pylstar import release
 from resources.sdist.test_command import test_command
-from resources.sdist.utils import opj
+from resources.sdist.utils import opj, read_file
 
 # +----------------------------------------------------------------------------
 # | Definition of the dependencies
 # +----------------------------------------------------------------------------
-dependencies = []
-with open('requirements.txt', 'r') as fd_requirements:
-    for dependency in fd_requirements:
-        dependencies.append(dependency.strip())
+dependencies = [dependency.strip() for dependency in read_file('requirements.txt').splitlines()
+                if len(dependency.strip()) > 0 and not dependency.strip().startswith('#')]
 
 extra_dependencies = {
     'docs': ['Sphinx>=1.1.3']
@@ -51,8 +49,8 @@ dependency_links = []
 data_files = []
 
 # Extract the long description from README.rst and NEWS.rst files
-README = open('README.rst', 'rt').read()
-NEWS = open('CHANGELOG.rst', 'rt').read()
+README = read_file('README.rst')
+NEWS = read_file('CHANGELOG.rst')
 
 # +----------------------------------------------------------------------------
 # | Extensions in the build operations (test, ...)
@@ -24,7 +24,9 @@
 # +----------------------------------------------------------------------------
 # | Global Imports
 # +----------------------------------------------------------------------------
-import abc
+import collections
+import logging
+from multiprocessing.pool import ThreadPool
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
@@ -41,35 +43,111 @@ class ActiveKnowledgeBase(KnowledgeBase):
 
     """
 
+    __slots__ = ('__max_workers',)
+
     def __init__(self, cache_file_path = None):
         super(ActiveKnowledgeBase, self).__init__(cache_file_path = cache_file_path)
+        self.max_workers = 1
 
     def _execute_word(self, word):
         """Executes the specified word."""
-        
-        if word is None:
-            raise Exception("Word cannot be None")
-        
-        self._logger.debug("Execute word '{}'".format(word))
+        return self._execute_words([word])[0]
+
+    def _execute_words(self, words):
+        """Executes the specified words. The target is started once before
+        submitting the first word and stopped once after the last one, thus
+        submit_word must play each word from the initial state of the target."""
 
         self.start_target()
         try:
-            return self.submit_word(word)
+            return self.submit_words(words)
         finally:
             self.stop_target()
 
-    @abc.abstractmethod
+    def submit_words(self, words):
+        """Submits the specified words to the target and returns their output
+        words in the same order. A word that appears several times is only
+        submitted once. Words are submitted concurrently if max_workers is
+        greater than 1, so subclasses that can share the cost of several
+        words (e.g. by pipelining them) should overwrite it.
+
+        >>> from pylstar.Letter import Letter
+        >>> from pylstar.Word import Word
+        >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase, EXAMPLE_AUTOMATA
+        >>> kbase = FakeActiveKnowledgeBase(EXAMPLE_AUTOMATA)
+        >>> kbase.max_workers = 2
+        >>> words = [Word([Letter("a"), Letter("b")]), Word([Letter("c")]), Word([Letter("c")])]
+        >>> print([str(word) for word in kbase.submit_words(words)])
+        ['[Letter(1), Letter(2)]', '[Letter(3)]', '[Letter(3)]']
+
+        """
+        if words is None:
+            raise Exception("Words cannot be None")
+
+        unique_words = collections.OrderedDict()
+        for word in words:
+            unique_words.setdefault(tuple(word.ids), word)
+        if len(unique_words) < len(words):
+            outputs = dict(zip(unique_words.keys(), self.submit_words(list(unique_words.values()))))
+            return [outputs[tuple(word.ids)] for word in words]
+
+        nb_workers = min(self.max_workers, len(words))
+        if nb_workers <= 1:
+            return [self.__submit_word(word) for word in words]
+
+        pool = ThreadPool(nb_workers)
+        try:
+            return pool.map(self.__submit_word, words)
+        finally:
+            pool.close()
+            pool.join()
+
+    def __submit_word(self, word):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Execute word '%s'", word)
+        return self.submit_word(word)
+
     def start_target(self):
         raise NotImplementedError()
 
-    @abc.abstractmethod    
     def stop_target(self):
         raise NotImplementedError()
 
-    @abc.abstractmethod    
     def submit_word(self, word):
         raise NotImplementedError()
 
+    @property
+    def max_workers(self):
+        """The number of threads that concurrently submit the words of a batch.
+        Setting it above 1 requires that submit_word supports concurrent calls,
+        which is the case of independent sessions opened on the target.
+
+        >>> from pylstar.Letter import Letter
+        >>> from pylstar.Word import Word
+        >>> from pylstar.OutputQuery import OutputQuery
+        >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase, EXAMPLE_AUTOMATA
+        >>> kbase = FakeActiveKnowledgeBase(EXAMPLE_AUTOMATA)
+        >>> kbase.max_workers = 4
+        >>> queries = [OutputQuery(Word([Letter(symbol)] * 3)) for symbol in "abc"]
+        >>> kbase.resolve_queries(queries)
+        >>> print([str(query.output_word) for query in queries])
+        ['[Letter(1), Letter(1), Letter(1)]', '[Letter(2), Letter(2), Letter(2)]', '[Letter(3), Letter(3), Letter(3)]']
+        >>> kbase.max_workers = 0
+        Traceback (most recent call last):
+        ...
+        Exception: Max workers must be > 0
+
+        """
+        return self.__max_workers
+
+    @max_workers.setter
+    def max_workers(self, max_workers):
+        if max_workers is None:
+            raise Exception("Max workers cannot be None")
+        if int(max_workers) < 1:
+            raise Exception("Max workers must be > 0")
+        self.__max_workers = int(max_workers)
+
         
         
 
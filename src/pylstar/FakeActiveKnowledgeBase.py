@@ -24,15 +24,47 @@
 # +----------------------------------------------------------------------------
 # | Global Imports
 # +----------------------------------------------------------------------------
-
+import logging
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
 # +----------------------------------------------------------------------------
 from pylstar.tools.Decorators import PylstarLogger
 from pylstar.ActiveKnowledgeBase import ActiveKnowledgeBase
-from pylstar.Letter import Letter, EmptyLetter
+from pylstar.Letter import Letter, EMPTY_LETTER
 from pylstar.Word import Word
+from pylstar.automata.State import State
+from pylstar.automata.Transition import Transition
+from pylstar.automata.Automata import Automata
+
+
+def build_example_automata():
+    """Builds the two-states automata used to illustrate the fake knowledge base.
+    Both states accept the input letters 'a', 'b' and 'c' that respectively emit
+    the output letters 1, 2 and 3. Letter 'b' leads to S1 and letter 'c' to S0.
+
+    >>> from pylstar.FakeActiveKnowledgeBase import build_example_automata
+    >>> automata = build_example_automata()
+    >>> print([state.name for state in automata.get_states()])
+    ['S0', 'S1']
+
+    """
+    (l_a, l_b, l_c) = (Letter.get('a'), Letter.get('b'), Letter.get('c'))
+    (l_1, l_2, l_3) = (Letter.get(1), Letter.get(2), Letter.get(3))
+    s0 = State("S0")
+    s1 = State("S1")
+    t1 = Transition("t1", output_state=s0, input_letter=l_a, output_letter=l_1)
+    t2 = Transition("t2", output_state=s1, input_letter=l_b, output_letter=l_2)
+    t3 = Transition("t3", output_state=s0, input_letter=l_c, output_letter=l_3)
+    s0.transitions = [t1, t2, t3]
+    t4 = Transition("t4", output_state=s1, input_letter=l_a, output_letter=l_1)
+    t5 = Transition("t5", output_state=s1, input_letter=l_b, output_letter=l_2)
+    t6 = Transition("t6", output_state=s0, input_letter=l_c, output_letter=l_3)
+    s1.transitions = [t4, t5, t6]
+    return Automata(s0)
+
+
+EXAMPLE_AUTOMATA = build_example_automata()
 
 
 @PylstarLogger
@@ -41,31 +73,17 @@ class FakeActiveKnowledgeBase(ActiveKnowledgeBase):
     on a preseted automata to answer queries.
 
     
-    >>> from pylstar.automata.State import State
-    >>> from pylstar.automata.Transition import Transition
-    >>> from pylstar.automata.Automata import Automata
+    The doctests rely on the two-states automata returned by
+    :func:`build_example_automata`, precomputed in ``EXAMPLE_AUTOMATA``.
+
     >>> from pylstar.Letter import Letter
     >>> from pylstar.Word import Word
     >>> from pylstar.OutputQuery import OutputQuery
-    >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase
-    >>> l_a = Letter('a')
-    >>> l_b = Letter('b')
-    >>> l_c = Letter('c')
-    >>> l_1 = Letter(1)
-    >>> l_2 = Letter(2)
-    >>> l_3 = Letter(3)
-    >>> s0 = State("S0")
-    >>> s1 = State("S1")
-    >>> t1 = Transition("t1", output_state=s0, input_letter=l_a, output_letter=l_1)
-    >>> t2 = Transition("t2", output_state=s1, input_letter=l_b, output_letter=l_2)
-    >>> t3 = Transition("t3", output_state=s0, input_letter=l_c, output_letter=l_3)
-    >>> s0.transitions = [t1, t2, t3]
-    >>> t4 = Transition("t4", output_state=s1, input_letter=l_a, output_letter=l_1)
-    >>> t5 = Transition("t5", output_state=s1, input_letter=l_b, output_letter=l_2)
-    >>> t6 = Transition("t6", output_state=s0, input_letter=l_c, output_letter=l_3)
-    >>> s1.transitions = [t4, t5, t6]
-    >>> automata = Automata(s0)
-    >>> kbase = FakeActiveKnowledgeBase(automata)
+    >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase, EXAMPLE_AUTOMATA
+    >>> l_a = Letter.get('a')
+    >>> l_b = Letter.get('b')
+    >>> l_c = Letter.get('c')
+    >>> kbase = FakeActiveKnowledgeBase(EXAMPLE_AUTOMATA)
     >>> w1 = Word([l_a])
     >>> o1 = OutputQuery(w1)    
     >>> w2 = Word([l_b])
@@ -84,6 +102,8 @@ class FakeActiveKnowledgeBase(ActiveKnowledgeBase):
 
     """
 
+    __slots__ = ('__automata', '__states', '__letter_ids', '__transitions')
+
     def __init__(self, automata):
         super(FakeActiveKnowledgeBase, self).__init__()
         self.automata = automata
@@ -95,46 +115,76 @@ class FakeActiveKnowledgeBase(ActiveKnowledgeBase):
         self._logger.debug("Stoping the fake target")        
 
     def submit_word(self, word):
-        self._logger.debug("Submiting word '{}' to the fake target".format(word))
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self._logger.debug("Submiting word '%s' to the fake target", word)
 
         if self.automata is None:
             raise Exception("Automata cannot be None")
         
-        current_state = self.automata.initial_state
+        # states are identified by their index in the encoded automata, the initial state being 0
+        current_state = 0
+        letter_ids = self.__letter_ids
+        transitions = self.__transitions
         output_letters = []
+        append_output_letter = output_letters.append
         for letter in word.letters:
-            try:
-                (current_state, output_letter) = self._next_state(current_state, letter)
-            except Exception:
-                output_letter = EmptyLetter()
-            
-            output_letters.append(output_letter)
-
-        output_word = Word(output_letters)
-        return output_word
-
-    def _next_state(self, current_state, letter):
-        if current_state is None:
-            raise Exception("Current state cannot be None")
-        if letter is None:
-            raise Exception("Letter cannot be None")
-
-        if letter == EmptyLetter:
-            return (current_state, EmptyLetter())
-
-        for transition in current_state.transitions:
-            if transition.input_letter == letter:
-                return (transition.output_state, transition.output_letter)
-        raise Exception("State '{}' accepts no transition triggered by letter '{}'".format(current_state, letter))
-                
-            
-
-        
-            
-
-        
-        
-
-        
-
-    
+            letter_id = letter_ids.get(letter)
+            transition = None
+            if letter_id is not None:
+                transition = transitions[current_state][letter_id]
+
+            if transition is None:
+                if debug:
+                    self._logger.debug("State '%s' accepts no transition triggered by letter '%s'", self.__states[current_state], letter)
+                append_output_letter(EMPTY_LETTER)
+            else:
+                (current_state, output_letter) = transition
+                append_output_letter(output_letter)
+
+        return Word(output_letters)
+
+    def __encode_automata(self, automata):
+        """This method encodes the states reachable in the specified automata and
+        their input letters with integers. It returns the list of states, the index of
+        each input letter and a table such that table[state][letter] is a tupple made of
+        the index of the reached state and the output letter (None if no transition exists)."""
+
+        states = []
+        state_ids = dict()
+        letter_ids = dict()
+        states_to_visit = [automata.initial_state]
+        while len(states_to_visit) > 0:
+            state = states_to_visit.pop(0)
+            if state in state_ids:
+                continue
+            state_ids[state] = len(states)
+            states.append(state)
+            for transition in state.transitions:
+                if transition.input_letter not in letter_ids:
+                    letter_ids[transition.input_letter] = len(letter_ids)
+                states_to_visit.append(transition.output_state)
+
+        transitions = []
+        for state in states:
+            state_transitions = [None] * len(letter_ids)
+            for transition in state.transitions:
+                letter_id = letter_ids[transition.input_letter]
+                if state_transitions[letter_id] is None:
+                    state_transitions[letter_id] = (state_ids[transition.output_state], transition.output_letter)
+            transitions.append(state_transitions)
+
+        return (states, letter_ids, transitions)
+
+    @property
+    def automata(self):
+        """The automata that answers the queries submitted to the fake target"""
+        return self.__automata
+
+    @automata.setter
+    def automata(self, automata):
+        self.__automata = automata
+        if automata is None:
+            (self.__states, self.__letter_ids, self.__transitions) = ([], dict(), [])
+        else:
+            (self.__states, self.__letter_ids, self.__transitions) = self.__encode_automata(automata)
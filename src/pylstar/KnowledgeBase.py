@@ -24,7 +24,7 @@
 # +----------------------------------------------------------------------------
 # | Global Imports
 # +----------------------------------------------------------------------------
-import abc
+import collections
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
@@ -75,11 +75,12 @@ class KnowledgeBase(object):
     
     """
 
-    __metaclass__ = abc.ABCMeta
+    __slots__ = ('knowledge_tree', 'stats', '_word_cache', '__max_cache_entries')
 
-    def __init__(self, cache_file_path = None):
+    def __init__(self, cache_file_path = None, max_cache_entries = None):
         self.knowledge_tree = KnowledgeTree(cache_file_path = cache_file_path)
         self.stats = KnowledgeBaseStats()
+        self.max_cache_entries = max_cache_entries
 
     def load_cache(self, possible_letters):
         self.knowledge_tree.load_cache(possible_letters)
@@ -87,6 +88,9 @@ class KnowledgeBase(object):
     def write_cache(self):
         self.knowledge_tree.write_cache()
 
+    def flush_cache(self):
+        self.knowledge_tree.flush_cache()
+
     def __str__(self):
         return str(self.knowledge_tree)
 
@@ -102,40 +106,214 @@ class KnowledgeBase(object):
 
         query.output_word = self._resolve_word(query.input_word)
 
-    def _resolve_word(self, word):
-        if word is None:
-            raise Exception("Word cannot be None")
+    def resolve_queries(self, queries):
+        """This method resolves the specified queries. The input words of queries
+        for which no previous knowledge can be found are submitted to the target
+        as a single batch.
+
+        >>> from pylstar.KnowledgeBase import KnowledgeBase
+        >>> from pylstar.OutputQuery import OutputQuery
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> kbase = KnowledgeBase()
+        >>> kbase.add_word(Word([Letter('a'), Letter('b')]), Word([Letter(1), Letter(2)]))
+        >>> query1 = OutputQuery(Word([Letter('a')]))
+        >>> query2 = OutputQuery(Word([Letter('a'), Letter('b')]))
+        >>> kbase.resolve_queries([query1, query2])
+        >>> print(query1.output_word)
+        [Letter(1)]
+        >>> print(query2.output_word)
+        [Letter(1), Letter(2)]
+        >>> kbase.resolve_queries([OutputQuery(Word([Letter('b')]))])
+        Traceback (most recent call last):
+        ...
+        Exception: Passive inference process
+
+        """
+        if queries is None:
+            raise Exception("Queries cannot be None")
 
-        try:
+        uncached_queries = []
+        for query in queries:
+            if query is None:
+                raise Exception("Query cannot be None")
+
+            word = query.input_word
             self.stats.nb_query += 1
             self.stats.nb_letter += len(word.letters)
 
-            return self.knowledge_tree.get_output_word(word)
-        except Exception:        
-            self._logger.debug("Knowledge base has no previous knowledge for '{}'".format(word))
+            key = tuple(word.ids)
+            query.output_word = self.__get_cached_output(key)
+            if query.output_word is None:
+                uncached_queries.append((key, query))
+
+        if len(uncached_queries) == 0:
+            return
+
+        # queries that miss the memo are looked up in the knowledge tree at once
+        known_outputs = self.knowledge_tree.find_output_words([query.input_word for (key, query) in uncached_queries])
+
+        words_to_execute = collections.OrderedDict()
+        unresolved_queries = []
+        for ((key, query), output) in zip(uncached_queries, known_outputs):
+            if output is not None:
+                self.__cache_output(key, output)
+                query.output_word = output
+            else:
+                words_to_execute[key] = query.input_word
+                unresolved_queries.append((key, query))
+
+        if len(words_to_execute) == 0:
+            return
+
+        # the output of a word is the prefix of the output of any word it prefixes,
+        # so such words are answered by the knowledge tree once the batch is executed
+        sorted_keys = sorted(words_to_execute.keys())
+        for (key, next_key) in zip(sorted_keys, sorted_keys[1:]):
+            if next_key[:len(key)] == key:
+                del words_to_execute[key]
+
+        for word in words_to_execute.values():
+            self.stats.nb_submited_query += 1
+            self.stats.nb_submited_letter += len(word.letters)
+
+        words = list(words_to_execute.values())
+        outputs = self._execute_words(words)
+        for (word, output) in zip(words, outputs):
+            self.__register_output_word(word, output)
+        self.__persist_submitted_words()
+
+        for (key, query) in unresolved_queries:
+            output = self.__get_cached_output(key)
+            if output is None:
+                output = self.knowledge_tree.find_output_word(query.input_word)
+                if output is not None:
+                    self.__cache_output(key, output)
+            query.output_word = output
 
+    def _resolve_word(self, word):
+        self.stats.nb_query += 1
+        self.stats.nb_letter += len(word.letters)
+
+        output = self.__get_known_output_word(word)
+        if output is None:
             self.stats.nb_submited_query += 1
             self.stats.nb_submited_letter += len(word.letters)
 
             output = self._execute_word(word)
-            
-            if output is not None:
-                self.knowledge_tree.add_word(input_word = word, output_word = output)
+            self.__register_output_word(word, output)
+            self.__persist_submitted_words()
+
+        return output
+
+    def __get_known_output_word(self, word):
+        """Returns the output word previously associated with the specified word,
+        None if it is unknown."""
+
+        key = tuple(word.ids)
+        output = self.__get_cached_output(key)
+        if output is not None:
             return output
+
+        output = self.knowledge_tree.find_output_word(word)
+        if output is None:
+            self._logger.debug("Knowledge base has no previous knowledge for '%s'", word)
+            return None
+
+        self.__cache_output(key, output)
+        return output
+
+    def __persist_submitted_words(self):
+        """Appends the answers of the target to the cache file, if any, so that a
+        later run loading it does not submit these words again."""
+        if self.knowledge_tree.cache_file_path is not None:
+            self.knowledge_tree.flush_cache()
+
+    def __get_cached_output(self, key):
+        if self.__max_cache_entries is None:
+            return self._word_cache.get(key)
+
+        output = self._word_cache.pop(key, None)
+        if output is not None:
+            # the entry becomes the most recently used one
+            self._word_cache[key] = output
+        return output
+
+    def __cache_output(self, key, output):
+        self._word_cache[key] = output
+        if self.__max_cache_entries is not None and len(self._word_cache) > self.__max_cache_entries:
+            self._word_cache.popitem(last = False)
+
+    def __register_output_word(self, input_word, output_word):
+        """Stores the output word produced by the target when executing the input word."""
+
+        if output_word is None:
+            return
+
+        # outputs of the prefixes of the word are memoized once they are looked
+        # up in the knowledge tree, which keeps the memo linear in the queries
+        self.knowledge_tree.add_word(input_word = input_word, output_word = output_word)
+        self.__cache_output(tuple(input_word.ids), output_word)
     
 
+    @property
+    def max_cache_entries(self):
+        """The maximum number of output words memoized in front of the knowledge
+        tree, None if it is not bounded. Once the memo is full, the least recently
+        used entry is evicted, the knowledge tree still holding its output.
+        Setting it clears the memo.
+
+        >>> from pylstar.KnowledgeBase import KnowledgeBase
+        >>> from pylstar.OutputQuery import OutputQuery
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> kbase = KnowledgeBase(max_cache_entries = 1)
+        >>> kbase.add_word(Word([Letter('a')]), Word([Letter(1)]))
+        >>> kbase.add_word(Word([Letter('b')]), Word([Letter(2)]))
+        >>> len(kbase._word_cache)
+        1
+        >>> query = OutputQuery(Word([Letter('a')]))
+        >>> kbase.resolve_query(query)
+        >>> print(query.output_word)
+        [Letter(1)]
+        >>> kbase.max_cache_entries = 0
+        Traceback (most recent call last):
+        ...
+        Exception: Max cache entries must be > 0
+
+        """
+        return self.__max_cache_entries
+
+    @max_cache_entries.setter
+    def max_cache_entries(self, max_cache_entries):
+        if max_cache_entries is None:
+            self._word_cache = dict()
+        else:
+            if int(max_cache_entries) < 1:
+                raise Exception("Max cache entries must be > 0")
+            max_cache_entries = int(max_cache_entries)
+            self._word_cache = collections.OrderedDict()
+        self.__max_cache_entries = max_cache_entries
+
     def _execute_word(self, word):
         """This method must be overwritten by subclasses that implements
         an active learning process.
         """
         raise Exception("Passive inference process")
+
+    def _execute_words(self, words):
+        """This method executes the specified words and returns the output words
+        in the same order. Subclasses can overwrite it to share the cost of
+        executing several words.
+        """
+        return [self._execute_word(word) for word in words]
         
     def add_word(self, input_word, output_word):
         """This method stores in the knowledge base the relationship between
         the specified input_word and output_word
         """
-        self._logger.debug("adding : {}".format(','.join([str(l) for l in input_word.letters])))
-        self.knowledge_tree.add_word(input_word, output_word)
+        self._logger.debug("adding : %s", input_word)
+        self.__register_output_word(input_word, output_word)
 
         
 
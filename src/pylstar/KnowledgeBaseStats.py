@@ -34,6 +34,22 @@ from pylstar.tools.Decorators import PylstarLogger
 
 @PylstarLogger
 class KnowledgeBaseStats(object):
+    """Counters of the queries and letters triggered while infering.
+
+    >>> from pylstar.KnowledgeBaseStats import KnowledgeBaseStats
+    >>> stats = KnowledgeBaseStats()
+    >>> stats.nb_query += 2
+    >>> stats.nb_letter += 5
+    >>> stats.validate()
+    >>> stats.nb_submited_query = -1
+    >>> stats.validate()
+    Traceback (most recent call last):
+    ...
+    Exception: Nb submited query must be > 0
+
+    """
+
+    __slots__ = ('nb_query', 'nb_submited_query', 'nb_letter', 'nb_submited_letter')
 
     def __init__(self):
         self.nb_query = 0
@@ -42,78 +58,47 @@ class KnowledgeBaseStats(object):
         self.nb_submited_letter = 0
         
     def __str__(self):
-        return """
-\t- nb query= {nb_query}
-\t- nb submited query= {nb_submited_query}
-\t- nb letter= {nb_letter}
-\t- nb submited letter= {nb_submited_letter}
-
-""".format(nb_query = self.nb_query,
-               nb_letter = self.nb_letter,
-               nb_submited_query = self.nb_submited_query,
-               nb_submited_letter = self.nb_submited_letter)
+        return "\n\t- nb query= %s\n\t- nb submited query= %s\n\t- nb letter= %s\n\t- nb submited letter= %s\n\t- cache hit ratio= %.2f\n\n" % (
+            self.nb_query, self.nb_submited_query, self.nb_letter, self.nb_submited_letter, self.cache_hit_ratio)
 
     @property
-    def nb_submited_query(self):
-        """Number of query submited to the target"""
-        return self.__nb_submited_query
-
-    @nb_submited_query.setter
-    def nb_submited_query(self, nb_submited_query):
-        if nb_submited_query is None:
-            raise Exception("Nb submited query cannot be None")
-        nb_submited_query = int(nb_submited_query)
-        if nb_submited_query < 0:
-            raise Exception("Nb submited query must be > 0")
-        
-        self.__nb_submited_query = nb_submited_query
-
-    @property
-    def nb_submited_letter(self):
-        """Number of letter submited to the target"""
-        return self.__nb_submited_letter
-
-    @nb_submited_letter.setter
-    def nb_submited_letter(self, nb_submited_letter):
-        if nb_submited_letter is None:
-            raise Exception("Nb submited letter cannot be None")
-        nb_submited_letter = int(nb_submited_letter)
-        if nb_submited_letter < 0:
-            raise Exception("Nb submited letter must be > 0")
-        
-        self.__nb_submited_letter = nb_submited_letter
-
-    
-    @property
-    def nb_letter(self):
-        """Number of letters triggered while infering"""
-        return self.__nb_letter
-
-    @nb_letter.setter
-    def nb_letter(self, nb_letter):
-        if nb_letter is None:
-            raise Exception("Nb letter cannot be None")
-        nb_letter = int(nb_letter)
-        if nb_letter < 0:
-            raise Exception("Nb letter must be > 0")
-        
-        self.__nb_letter = nb_letter
-
-    @property
-    def nb_query(self):
-        """Number of queries triggered while infering"""
-        return self.__nb_query
-
-    @nb_query.setter
-    def nb_query(self, nb_query):
-        if nb_query is None:
-            raise Exception("Nb query cannot be None")
-        nb_query = int(nb_query)
-        if nb_query < 0:
-            raise Exception("Nb query must be > 0")
-        
-        self.__nb_query = nb_query
-        
-        
-
-    
+    def cache_hit_ratio(self):
+        """The ratio of queries answered without submitting them to the target.
+        The observation table and the equivalence tests share the knowledge base,
+        hence this ratio covers both.
+
+        >>> from pylstar.KnowledgeBaseStats import KnowledgeBaseStats
+        >>> stats = KnowledgeBaseStats()
+        >>> stats.cache_hit_ratio
+        0.0
+        >>> stats.nb_query = 4
+        >>> stats.nb_submited_query = 1
+        >>> stats.cache_hit_ratio
+        0.75
+
+        """
+        if self.nb_query == 0:
+            return 0.0
+        return float(self.nb_query - self.nb_submited_query) / self.nb_query
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def validate(self):
+        """This method checks the counters hold positive integers"""
+
+        counters = [
+            ("Nb query", self.nb_query),
+            ("Nb submited query", self.nb_submited_query),
+            ("Nb letter", self.nb_letter),
+            ("Nb submited letter", self.nb_submited_letter)
+        ]
+        for (counter_name, counter) in counters:
+            if counter is None:
+                raise Exception("{} cannot be None".format(counter_name))
+            if int(counter) < 0:
+                raise Exception("{} must be > 0".format(counter_name))
@@ -26,6 +26,28 @@
 # +----------------------------------------------------------------------------
 import os
 import json
+import array
+import collections
+import logging
+
+# os.replace() is not available on Python 2, where os.rename() overwrites
+# the destination on POSIX systems
+replace_file = getattr(os, 'replace', os.rename)
+
+# The cache file is encoded with orjson only if this dependency is available
+# on the current system.
+try:
+    import orjson
+
+    def dump_json(data):
+        return orjson.dumps(data).decode('utf-8')
+
+    load_json = orjson.loads
+except ImportError:
+    def dump_json(data):
+        return json.dumps(data, separators=(',', ':'))
+
+    load_json = json.loads
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
@@ -37,101 +59,258 @@ from pylstar.Letter import Letter
 
 @PylstarLogger
 class KnowledgeNode(object):
+    """A node of the knowledge tree. Chains of nodes that have a single child are
+    collapsed into one node whose edge holds a sequence of input letters and the
+    output letters associated with them. A node is split when a word diverges in
+    the middle of its edge.
+
+    Input letters are stored by their integer identifiers (see Letter.id).
+
+    >>> from pylstar.KnowledgeTree import KnowledgeNode
+    >>> from pylstar.Letter import Letter
+    >>> (l_a, l_b, l_c, l_1, l_2, l_3) = (Letter("a"), Letter("b"), Letter("c"), Letter(1), Letter(2), Letter(3))
+    >>> node = KnowledgeNode([l_a.id, l_b.id, l_c.id], [l_1, l_2, l_3])
+    >>> node.traverse_insert([l_a.id, l_b.id], [l_1, l_2])
+    False
+    >>> len(node.children)
+    0
+    >>> node.traverse_insert([l_a.id, l_c.id], [l_1, l_3])
+    True
+    >>> print(node.input_letters)
+    [Letter('a')]
+    >>> print(node.children[l_b.id].input_letters)
+    [Letter('b'), Letter('c')]
+    >>> print(node.children[l_c.id].input_letters)
+    [Letter('c')]
+    >>> node.traverse_query([l_a.id, l_b.id, l_c.id])
+    [Letter(1), Letter(2), Letter(3)]
+    >>> print(node.traverse_query([l_a.id, l_a.id]))
+    None
+
+    """
 
-    def __init__(self, input_letter, output_letter):
-        self.input_letter = input_letter
-        self.output_letter = output_letter
+    __slots__ = ('input_ids', 'output_letters', 'children')
+
+    def __init__(self, input_ids, output_letters):
+        if input_ids is None or len(input_ids) == 0:
+            raise Exception("Input ids cannot be None or empty")
+        if output_letters is None or len(output_letters) == 0:
+            raise Exception("Output letters cannot be None or empty")
+        self.input_ids = array.array('i', input_ids)
+        self.output_letters = list(output_letters)
         self.children = dict()
 
     def __str__(self, level=0):
         return json.dumps(self.serialize(), sort_keys=True, indent=4, separators=(',', ': '))
 
     def serialize(self):
-        """This method return a serialized representation of the node"""
-        node = {
-            "input_letter" : self.input_letter.serialize(),
-            "output_letter": self.output_letter.serialize(),
-            "children" : [c.serialize() for c in self.children.values()]
-        }
+        """This method return a serialized representation of the node.
+        Letters of the edge are serialized as a chain of nodes, one per letter."""
+        (node, children) = self.__serialize_edge()
+        nodes_to_serialize = [(self, children)]
+        while len(nodes_to_serialize) > 0:
+            (current_node, children) = nodes_to_serialize.pop()
+            for child in current_node.children.values():
+                (serialized_child, child_children) = child.__serialize_edge()
+                children.append(serialized_child)
+                nodes_to_serialize.append((child, child_children))
         return node
+
+    def __serialize_edge(self):
+        """Returns the chain of serialized nodes of the edge and the (empty) list
+        that must host the children of its last node."""
+        children = []
+        node = None
+        for i in range(len(self.input_ids) - 1, -1, -1):
+            node = {
+                "input_letter" : Letter.from_id(self.input_ids[i]).serialize(),
+                "output_letter": self.output_letters[i].serialize(),
+                "children" : [node] if node is not None else children
+            }
+        return (node, children)
     
     @staticmethod
     def deserialize(dict_data, possible_letters):
         if dict_data is None:
             raise Exception("dict_data cannot be None")
-        input_letter = Letter.deserialize(dict_data['input_letter'], possible_letters)
-        output_letter = Letter.deserialize(dict_data['output_letter'], possible_letters)
-        node = KnowledgeNode(input_letter, output_letter)
-        for child in dict_data["children"]:
-            child_node = KnowledgeNode.deserialize(child, possible_letters)
-            node.children[child_node.input_letter] = child_node
-
-        return node
-
-    def traverse(self, input_letters, output_letters = None):
-
-        if input_letters[0] != self.input_letter:
-            raise Exception("Node cannot be traversed with input letter '{}'".format(input_letters[0]))
-        if output_letters is not None and output_letters[0] != self.output_letter:
-            raise Exception("Node '{}' cannot be traversed with output letter '{}'".format(self, output_letters[0]))
-        if output_letters is not None and len(input_letters) != len(output_letters):
-            raise Exception("Specified input and output letters do not have the same length")
 
+        root = None
+        nodes_to_deserialize = [(dict_data, None)]
+        while len(nodes_to_deserialize) > 0:
+            (dict_data, parent) = nodes_to_deserialize.pop()
+
+            # chains of serialized nodes with a single child are collapsed in one edge
+            input_ids = []
+            output_letters = []
+            while True:
+                input_ids.append(Letter.deserialize(dict_data['input_letter'], possible_letters).id)
+                output_letters.append(Letter.deserialize(dict_data['output_letter'], possible_letters))
+                if len(dict_data["children"]) != 1:
+                    break
+                dict_data = dict_data["children"][0]
+
+            node = KnowledgeNode(input_ids, output_letters)
+            if parent is None:
+                root = node
+            else:
+                parent.children[input_ids[0]] = node
+            for child in dict_data["children"]:
+                nodes_to_deserialize.append((child, node))
 
-        if len(input_letters) < 2:
-            return [self.output_letter]
+        return root
 
-        current_input_letter = input_letters[1]
-        current_output_letter = None
-        if output_letters is not None:
-            current_output_letter = output_letters[1]
+    @staticmethod
+    def serialize_nodes(roots):
+        """Returns a flat representation of the specified trees. Each node is described by
+        the index of its parent (-1 for roots) and the input and output letters of its edge,
+        parents being listed before their children.
 
+        >>> from pylstar.KnowledgeTree import KnowledgeNode
+        >>> from pylstar.Letter import Letter
+        >>> (l_a, l_b, l_c, l_1, l_2, l_3) = (Letter("a"), Letter("b"), Letter("c"), Letter(1), Letter(2), Letter(3))
+        >>> root = KnowledgeNode([l_a.id, l_b.id], [l_1, l_2])
+        >>> root.traverse_insert([l_a.id, l_c.id], [l_1, l_3])
+        True
+        >>> records = KnowledgeNode.serialize_nodes([root])
+        >>> print(records)
+        [[-1, ["'a'"], ['1']], [0, ["'b'"], ['2']], [0, ["'c'"], ['3']]]
+        >>> roots = KnowledgeNode.deserialize_nodes(records, [l_a, l_b, l_c, l_1, l_2, l_3])
+        >>> roots[0].traverse_query([l_a.id, l_c.id])
+        [Letter(1), Letter(3)]
 
-        if current_input_letter in self.children:
-            child = self.children[current_input_letter]
-            
-            if current_output_letter is not None and child.output_letter != current_output_letter:
-                raise Exception("Incompatible path found, expected '{}' found '{}'".format(child.output_letter.symbols, current_output_letter.symbols))
+        """
+        records = []
+        nodes_to_serialize = collections.deque([(root, -1) for root in roots])
+        while len(nodes_to_serialize) > 0:
+            (node, parent_index) = nodes_to_serialize.popleft()
+            records.append([
+                parent_index,
+                [Letter.from_id(input_id).serialize() for input_id in node.input_ids],
+                [output_letter.serialize() for output_letter in node.output_letters]
+            ])
+            node_index = len(records) - 1
+            for child in node.children.values():
+                nodes_to_serialize.append((child, node_index))
+        return records
 
-            if output_letters is None:
-                new_output_letters = None
+    @staticmethod
+    def deserialize_nodes(records, possible_letters):
+        """Returns the roots of the trees described by the specified flat representation.
+        See doctest declared in method "serialize_nodes"."""
+        letters = dict()
+
+        def deserialize_letter(str_letter):
+            letter = letters.get(str_letter)
+            if letter is None:
+                letter = Letter.deserialize(str_letter, possible_letters)
+                letters[str_letter] = letter
+            return letter
+
+        roots = []
+        nodes = []
+        for (parent_index, str_input_letters, str_output_letters) in records:
+            node = KnowledgeNode(
+                [deserialize_letter(l).id for l in str_input_letters],
+                [deserialize_letter(l) for l in str_output_letters])
+            nodes.append(node)
+            if parent_index < 0:
+                roots.append(node)
             else:
-                new_output_letters = output_letters[1:]
-                
-            new_input_letters = input_letters[1:]            
+                nodes[parent_index].children[node.input_ids[0]] = node
+        return roots
+
+    def traverse_query(self, input_ids):
+        """Walks down from this node following the specified input letter identifiers and
+        returns the output letters met on the path, None if the path does not exist."""
+
+        # edges are compared with the slices of an array of the same type,
+        # which compares their identifiers natively rather than one by one
+        input_array = array.array('i', input_ids)
+        node = self
+        output_letters = []
+        i = 0
+        while True:
+            edge_input_ids = node.input_ids
+            nb_letters = min(len(edge_input_ids), len(input_ids) - i)
+            if nb_letters == len(edge_input_ids):
+                if input_array[i:i + nb_letters] != edge_input_ids:
+                    return None
+            elif input_array[i:i + nb_letters] != edge_input_ids[:nb_letters]:
+                return None
+            output_letters.extend(node.output_letters[:nb_letters])
+            i += nb_letters
+            if i == len(input_ids):
+                return output_letters
+            node = node.children.get(input_ids[i])
+            if node is None:
+                return None
+
+    def traverse_insert(self, input_ids, output_letters):
+        """Walks down from this node following the specified input letter identifiers.
+        Missing nodes are created and the output letters of existing ones are checked
+        against the specified output letters. Returns True if a node was created, split
+        or extended, False if the whole path was already known."""
+
+        if input_ids[0] != self.input_ids[0]:
+            raise Exception("Node cannot be traversed with input letter '{}'".format(Letter.from_id(input_ids[0])))
+        if len(input_ids) != len(output_letters):
+            raise Exception("Specified input and output letters do not have the same length")
 
-            return [self.output_letter] + child.traverse(new_input_letters, output_letters = new_output_letters)
-        
-        elif output_letters is not None:
-            new_children = KnowledgeNode(input_letter = input_letters[1], output_letter = output_letters[1])
-            self.children[new_children.input_letter] = new_children
-            new_input_letters = input_letters[1:]
-            new_output_letters = output_letters[1:]
-            return [self.output_letter] + new_children.traverse(new_input_letters, output_letters = new_output_letters)
+        node = self
+        i = 0
+        while True:
+            edge_input_ids = node.input_ids
+            edge_output_letters = node.output_letters
+            for j in range(len(edge_input_ids)):
+                if i + j == len(input_ids):
+                    return False
+                if input_ids[i + j] != edge_input_ids[j]:
+                    node.__split(j)
+                    new_node = KnowledgeNode(input_ids[i + j:], output_letters[i + j:])
+                    node.children[new_node.input_ids[0]] = new_node
+                    return True
+                if output_letters[i + j] is not edge_output_letters[j] and output_letters[i + j] != edge_output_letters[j]:
+                    raise Exception("Incompatible path found, expected '{}' found '{}'".format(edge_output_letters[j].symbols, output_letters[i + j].symbols))
+
+            i += len(edge_input_ids)
+            if i == len(input_ids):
+                return False
+
+            child = node.children.get(input_ids[i])
+            if child is None:
+                new_output_letters = output_letters[i:]
+                if len(node.children) == 0:
+                    # a leaf is extended rather than given a single child
+                    node.input_ids.extend(input_ids[i:])
+                    node.output_letters.extend(new_output_letters)
+                else:
+                    node.children[input_ids[i]] = KnowledgeNode(input_ids[i:], new_output_letters)
+                return True
+            node = child
+
+    def __split(self, position):
+        """Splits the edge of this node before the specified position, the end
+        of the edge and the children are moved to a new child node."""
+        suffix = KnowledgeNode(self.input_ids[position:], self.output_letters[position:])
+        suffix.children = self.children
+        self.input_ids = self.input_ids[:position]
+        self.output_letters = self.output_letters[:position]
+        self.children = {suffix.input_ids[0]: suffix}
 
-        raise Exception("Cannot traverse node '{}' with subsequences '{}'".format(self, ', '.join([str(l) for l in input_letters])))
+    @property
+    def input_letters(self):
+        """Input letters of the edge"""
+        return [Letter.from_id(input_id) for input_id in self.input_ids]
 
     @property
     def input_letter(self):
-        """Input letter"""
-        return self.__input_letter
-
-    @input_letter.setter
-    def input_letter(self, input_letter):
-        if input_letter is None:
-            raise Exception("Input letter cannot be None")
-        self.__input_letter = input_letter
+        """First input letter of the edge"""
+        return Letter.from_id(self.input_ids[0])
 
     @property
     def output_letter(self):
-        """Output letter"""
-        return self.__output_letter
-
-    @output_letter.setter
-    def output_letter(self, output_letter):
-        if output_letter is None:
-            raise Exception("Output letter cannot be None")
-        self.__output_letter = output_letter
+        """First output letter of the edge"""
+        return self.output_letters[0]
 
 
 @PylstarLogger
@@ -159,10 +338,12 @@ class KnowledgeTree(object):
     def __init__(self, cache_file_path = None):
         self.__cache_file_path = cache_file_path
         self.__nb_added_word = 0
-        self.roots = []
+        # words added since the cache file was last written
+        self.__journal = []
+        self.roots = dict()
 
     def __str__(self):
-        result = '\n'.join([root.__str__(level=1).rstrip() for root in self.roots])
+        result = '\n'.join([root.__str__(level=1).rstrip() for root in self.roots.values()])
         return 'Tree (\n{}\n)'.format(result)
 
 
@@ -170,15 +351,59 @@ class KnowledgeTree(object):
         if input_word is None:
             raise Exception("Input word cannot be None")
 
-        for root in self.roots:
-            try:
-                w = Word(root.traverse(input_word.letters))
-                self._logger.info("I = {} > O = {}".format(input_word, w))
-                return w
-            except Exception:
-                pass
+        w = self.find_output_word(input_word)
+        if w is None:
+            raise Exception("No path found")
+        return w
+
+    def find_output_word(self, input_word):
+        """This method returns the output word associated with the specified input word,
+        None if no such path exists in the tree.
+
+        >>> from pylstar.KnowledgeTree import KnowledgeTree
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> tree = KnowledgeTree()
+        >>> tree.add_word(Word([Letter("a"), Letter("b")]), Word([Letter(1), Letter(2)]))
+        >>> print(tree.find_output_word(Word([Letter("a")])))
+        [Letter(1)]
+        >>> print(tree.find_output_word(Word([Letter("a"), Letter("c")])))
+        None
+
+        """
+        input_ids = input_word.ids
+        if len(input_ids) == 0:
+            return None
+
+        node = self.roots.get(input_ids[0])
+        if node is None:
+            return None
+
+        output_letters = node.traverse_query(input_ids)
+        if output_letters is None:
+            return None
+
+        return Word(output_letters)
+
+    def find_output_words(self, input_words):
+        """This method returns the output words associated with each of the specified
+        input words, None for the input words that have no path in the tree.
 
-        raise Exception("No path found")
+        >>> from pylstar.KnowledgeTree import KnowledgeTree
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> tree = KnowledgeTree()
+        >>> tree.add_word(Word([Letter("a"), Letter("b")]), Word([Letter(1), Letter(2)]))
+        >>> words = [Word([Letter("a")]), Word([Letter("b")]), Word([Letter("a"), Letter("b")])]
+        >>> print([str(w) for w in tree.find_output_words(words)])
+        ['[Letter(1)]', 'None', '[Letter(1), Letter(2)]']
+
+        """
+        if input_words is None:
+            raise Exception("Input words cannot be None")
+
+        find_output_word = self.find_output_word
+        return [find_output_word(input_word) for input_word in input_words]
 
     def add_word(self, input_word, output_word):
         """This method can be use to associate an input word to an output word
@@ -208,7 +433,7 @@ class KnowledgeTree(object):
         >>> tree.add_word(input_word2, output_word3)
         Traceback (most recent call last):
         ...
-        Exception: Incompatible path found, expected '{2}' found '{1}'
+        Exception: Incompatible path found, expected '(2,)' found '(1,)'
 
         """
 
@@ -219,11 +444,59 @@ class KnowledgeTree(object):
         if len(input_word) != len(output_word):
             raise Exception("Input and output words do not have the same size")
 
-        self.__add_letters(input_word.letters, output_word.letters)
+        if not self.__add_letters(input_word.letters, output_word.letters):
+            # the exact same association is already in the tree
+            return
 
         self.__nb_added_word += 1
-        if self.__cache_file_path is not None and self.__nb_added_word % 100 == 0:
-            self.write_cache()
+        if self.__cache_file_path is not None:
+            self.__journal.append((input_word, output_word))
+            if self.__nb_added_word % 100 == 0:
+                self.__flush_journal()
+
+    def __flush_journal(self):
+        """Appends the words added since the last flush to the cache file, one JSON line per word."""
+
+        if len(self.__journal) == 0:
+            return
+
+        self._logger.info("Appending %d words to cache '%s'", len(self.__journal), self.__cache_file_path)
+        with open(self.__cache_file_path, "a") as fd:
+            for (input_word, output_word) in self.__journal:
+                entry = {
+                    "input": [l.serialize() for l in input_word.letters],
+                    "output": [l.serialize() for l in output_word.letters]
+                }
+                fd.write(dump_json(entry))
+                fd.write("\n")
+        self.__journal = []
+
+    @property
+    def cache_file_path(self):
+        """The path of the file the knowledge tree is persisted in, None if it is not persisted"""
+        return self.__cache_file_path
+
+    def flush_cache(self):
+        """Appends to the cache file the words added since it was last written,
+        which are otherwise appended every 100 insertions.
+
+        >>> cache_file = "/tmp/test_ktree_flush.dump"
+        >>> from pylstar.KnowledgeTree import KnowledgeTree
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> tree = KnowledgeTree(cache_file_path = cache_file)
+        >>> tree.write_cache()
+        >>> tree.add_word(Word([Letter("a")]), Word([Letter(1)]))
+        >>> tree.flush_cache()
+        >>> tree2 = KnowledgeTree(cache_file_path = cache_file)
+        >>> tree2.load_cache(possible_letters = [Letter("a"), Letter(1)])
+        >>> print(tree2.get_output_word(Word([Letter("a")])))
+        [Letter(1)]
+
+        """
+        if self.__cache_file_path is None:
+            raise Exception("Cache file path cannot be None")
+        self.__flush_journal()
 
     def write_cache(self):
         """This method writes the content of the knowledge tree to the self.cache_file_path.
@@ -259,49 +532,105 @@ class KnowledgeTree(object):
 
         self._logger.info("Writing the knowledge tree in cache '{}'".format(self.__cache_file_path))
 
-        if os.path.exists(self.__cache_file_path):
-            self._logger.info("Removing previous cache file '{}'".format(self.__cache_file_path))
-            os.remove(self.__cache_file_path)
-
-        nodes = [ root.serialize() for root in self.roots ]
-        with open(self.__cache_file_path, "w") as fd:
-            str_content = json.dumps(nodes, sort_keys=True, indent=4, separators=(',', ': '))
-            fd.write(str_content)
+        # the snapshot is written aside, then atomically substituted to the previous cache
+        snapshot = {"nodes": KnowledgeNode.serialize_nodes(self.roots.values())}
+        tmp_cache_file_path = "{}.tmp".format(self.__cache_file_path)
+        with open(tmp_cache_file_path, "w") as fd:
+            fd.write(dump_json(snapshot))
+            fd.write("\n")
+        replace_file(tmp_cache_file_path, self.__cache_file_path)
+        self.__journal = []
 
     def load_cache(self, possible_letters):
-        """This method loads the content of the cache in the knowledge tree
+        """This method loads the content of the cache in the knowledge tree.
+        The cache file starts with the snapshot written by "write_cache", followed by
+        the words appended every 100 insertions.
 
         See doctest declared in method "write_cache"
-    
+
+        >>> cache_file = "/tmp/test_ktree_journal.dump"
+        >>> from pylstar.KnowledgeTree import KnowledgeTree
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> l_a = Letter("a")
+        >>> l_1 = Letter(1)
+        >>> tree = KnowledgeTree(cache_file_path = cache_file)
+        >>> tree.write_cache()
+        >>> for i in range(1, 101):
+        ...     tree.add_word(Word([l_a] * i), Word([l_1] * i))
+        >>> tree2 = KnowledgeTree(cache_file_path = cache_file)
+        >>> tree2.load_cache(possible_letters = [l_a, l_1])
+        >>> len(tree2.get_output_word(Word([l_a] * 100)))
+        100
+
+        Snapshots written by previous versions were indented over several
+        lines, words appended afterwards are read as well.
+
+        >>> import json
+        >>> tree.write_cache()
+        >>> with open(cache_file) as fd:
+        ...     snapshot = json.load(fd)
+        >>> with open(cache_file, "w") as fd:
+        ...     _ = fd.write(json.dumps(snapshot, indent = 4) + "\\n")
+        >>> tree.add_word(Word([Letter("b")]), Word([l_1]))
+        >>> tree.flush_cache()
+        >>> tree3 = KnowledgeTree(cache_file_path = cache_file)
+        >>> tree3.load_cache(possible_letters = [l_a, Letter("b"), l_1])
+        >>> len(tree3.get_output_word(Word([l_a] * 100)))
+        100
+        >>> print(tree3.get_output_word(Word([Letter("b")])))
+        [Letter(1)]
+
         """
         if self.__cache_file_path is None:
             raise Exception("Cache file path cannot be None")
         self._logger.info("Loading cache from '{}'".format(self.__cache_file_path))
 
-        json_content = None
-
         with open(self.__cache_file_path, "r") as fd:
-            json_content = json.loads(fd.read())
-
-        for content in json_content:
-            root = KnowledgeNode.deserialize(content, possible_letters)
-            self.roots.append(root)
+            content = fd.read()
+
+        try:
+            # the cache only holds a snapshot, possibly indented by previous versions
+            entries = [load_json(content)]
+        except ValueError:
+            # the first entry may be a snapshot indented over several lines by
+            # previous versions, the journal follows with one entry per line
+            content = content.lstrip()
+            (first_entry, end) = json.JSONDecoder().raw_decode(content)
+            entries = [first_entry]
+            entries.extend([load_json(line) for line in content[end:].splitlines() if len(line.strip()) > 0])
+
+        for entry in entries:
+            if isinstance(entry, list):
+                # nested snapshot written by previous versions
+                for node in entry:
+                    root = KnowledgeNode.deserialize(node, possible_letters)
+                    self.roots[root.input_ids[0]] = root
+            elif "nodes" in entry:
+                for root in KnowledgeNode.deserialize_nodes(entry["nodes"], possible_letters):
+                    self.roots[root.input_ids[0]] = root
+            else:
+                input_letters = [Letter.deserialize(l, possible_letters) for l in entry["input"]]
+                output_letters = [Letter.deserialize(l, possible_letters) for l in entry["output"]]
+                self.__add_letters(input_letters, output_letters)
         
     def __add_letters(self, input_letters, output_letters):
-        self._logger.debug("Adding letters '{}' / '{}'".format(', '.join([str(l) for l in input_letters]), ', '.join([str(l) for l in output_letters])))
+        """Inserts the specified letters in the tree, returns True if a node was created,
+        split or extended."""
+
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Adding letters '%s' / '%s'", ', '.join([str(l) for l in input_letters]), ', '.join([str(l) for l in output_letters]))
 
-        retained_root = None
+        input_ids = [letter.id for letter in input_letters]
+        retained_root = self.roots.get(input_ids[0])
 
-        for root in self.roots:
-            if root.input_letter == input_letters[0]:
-                if root.output_letter != output_letters[0]:
-                    raise Exception("Incompatible path found, expected '{}' found '{}'".format(root.output_letter.symbols, output_letters[0].symbols))
-                retained_root = root
-                break
+        if retained_root is not None and retained_root.output_letter != output_letters[0]:
+            raise Exception("Incompatible path found, expected '{}' found '{}'".format(retained_root.output_letter.symbols, output_letters[0].symbols))
 
         if retained_root is None:
-            retained_root = KnowledgeNode(input_letters[0], output_letters[0])
-            self._logger.debug("Creating '{}' as a new root".format(retained_root))
-            self.roots.append(retained_root)
+            retained_root = KnowledgeNode(input_ids, output_letters)
+            self._logger.debug("Creating '%s' as a new root", retained_root)
+            self.roots[input_ids[0]] = retained_root
+            return True
 
-        return retained_root.traverse(input_letters, output_letters)
+        return retained_root.traverse_insert(input_ids, output_letters)
@@ -28,6 +28,7 @@ import tempfile
 import os
 from datetime import datetime
 import time
+from multiprocessing.pool import ThreadPool
 
 # +----------------------------------------------------------------------------
 # | pylstar Imports
@@ -241,7 +242,7 @@ class LSTAR(object):
     
     """
 
-    def __init__(self, input_vocabulary, knowledge_base, max_states, tmp_dir=None, eqtests=None):
+    def __init__(self, input_vocabulary, knowledge_base, max_states, tmp_dir=None, eqtests=None, serialize_every=None):
         """Implementation of the LSTAR algorithm.
 
         Per default, WPMethod is used for equivalence tests. However, one can prefer a RandomWalkMethod
@@ -249,17 +250,22 @@ class LSTAR(object):
         
         eqtests = RandomWalkMethod(self.knowledge_base, self.input_letters, 10000, 0.7)
 
+        Per default, only the final hypothesis is serialized in 'tmp_dir'. The hypothesis of
+        every n-th round is also serialized by specifying 'serialize_every = n'.
+
         """
 
 
     
-        self.input_letters = [Letter(symbol) for symbol in input_vocabulary]
+        self.input_letters = [Letter.get(symbol) for symbol in input_vocabulary]
         self.knowledge_base = knowledge_base
         self.tmp_dir = tmp_dir
         self.observation_table = ObservationTable(self.input_letters, self.knowledge_base)
         self.max_states = max_states
         self.eqtests = eqtests
+        self.serialize_every = serialize_every
         self.__f_stop = False
+        self.__io_pool = None
 
     def stop(self):
         """This method can be use to trigger the end of the learning process"""
@@ -275,23 +281,37 @@ class LSTAR(object):
 
         f_hypothesis_is_valid = False
         i_round = 1
-        
-        while not f_hypothesis_is_valid and not self.__f_stop:
-        
-            hypothesis = self.build_hypothesis(i_round)
+        hypothesis = None
+        f_serialized = False
 
-            self.__serialize_hypothesis(i_round, hypothesis)
+        # files are written by a background thread, off the learning path
+        self.__io_pool = ThreadPool(1)
+        try:
+            while not f_hypothesis_is_valid and not self.__f_stop:
 
-            counterexample = self.eqtests.find_counterexample(hypothesis)
-            if counterexample is not None:
-                self._logger.info("Counterexample '{}' found.".format(counterexample))
-                self.fix_hypothesis(counterexample)
-            else:
-                f_hypothesis_is_valid = True
+                hypothesis = self.build_hypothesis(i_round)
+
+                f_serialized = False
+                if self.serialize_every is not None and i_round % self.serialize_every == 0:
+                    self.__serialize_hypothesis(i_round, hypothesis)
+                    f_serialized = True
 
-            i_round += 1
+                counterexample = self.eqtests.find_counterexample(hypothesis)
+                if counterexample is not None:
+                    self._logger.info("Counterexample '{}' found.".format(counterexample))
+                    self.fix_hypothesis(counterexample)
+                else:
+                    f_hypothesis_is_valid = True
 
-        self.__serialize_observation_table(i_round)
+                i_round += 1
+
+            if hypothesis is not None and not f_serialized:
+                self.__serialize_hypothesis(i_round - 1, hypothesis)
+            self.__serialize_observation_table(i_round)
+        finally:
+            self.__io_pool.close()
+            self.__io_pool.join()
+            self.__io_pool = None
 
         self._logger.info("Automata successfully computed")
         return hypothesis
@@ -302,29 +322,44 @@ class LSTAR(object):
         if hypothesis is None:
             raise Exception("Hypothesis cannot be None")
 
-        dot_code = hypothesis.build_dot_code()
+        # hypotheses are not modified once built, their DOT code can be computed later
         filepath = os.path.join(self.tmp_dir, "hypothesis_{}.dot".format(i_round))
-        with open(filepath, 'w') as fd:
-            fd.write(dot_code)
+        self.__write_file(filepath, hypothesis.build_dot_code)
 
         self._logger.info("Hypothesis produced on round '{}' stored in '{}'".format(i_round, filepath))
 
     def __serialize_observation_table(self, i_round):
         if self.observation_table is None:
             raise Exception("Observation table cannot ne Bone")
-        
+
+        # the observation table keeps changing, it is serialized right away
         serialized_table = self.observation_table.serialize()
         str_date = datetime.strftime(datetime.now(), "%Y%m%d_%H%M%S")
         filepath = os.path.join(self.tmp_dir, "observation_table_{}_{}.raw".format(i_round, str_date))
-        with open(filepath, 'w') as fd:
-            fd.write(serialized_table)
+        self.__write_file(filepath, lambda: serialized_table)
 
         self._logger.info("Observation table serialized in '{}'".format(filepath))
+
+    def __write_file(self, filepath, build_content):
+        """Writes the content returned by build_content in the specified file,
+        in the background if the learning process is running."""
+
+        def write():
+            try:
+                with open(filepath, 'w') as fd:
+                    fd.write(build_content())
+            except Exception as e:
+                self._logger.error(e, exc_info=True)
+
+        if self.__io_pool is None:
+            write()
+        else:
+            self.__io_pool.apply_async(write)
         
     def fix_hypothesis(self, counterexample):
         if counterexample is None:
             raise Exception("counterexample cannot be None")
-        self._logger.debug("fix hypothesis with counterexample '{}'".format(counterexample))
+        self._logger.debug("fix hypothesis with counterexample '%s'", counterexample)
 
         input_word = counterexample.input_word
         output_word = counterexample.output_word        
@@ -355,8 +390,6 @@ class LSTAR(object):
             else:
                 self._logger.info("Observation table is consistent")
                 f_consistent = True
-
-            self.__serialize_observation_table(i_round)
                                 
         self._logger.info("Hypothesis computed")
         return self.observation_table.build_hypothesis()
@@ -406,6 +439,30 @@ class LSTAR(object):
         else:
             self.__tmp_dir = value
 
+    @property
+    def serialize_every(self):
+        """The number of rounds between two serialized hypotheses, None to
+        only serialize the final hypothesis
+
+        >>> from pylstar.LSTAR import LSTAR
+        >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase, EXAMPLE_AUTOMATA
+        >>> lstar = LSTAR(["a", "b", "c"], FakeActiveKnowledgeBase(EXAMPLE_AUTOMATA), max_states = 2, serialize_every = 1)
+        >>> lstar.serialize_every = 0
+        Traceback (most recent call last):
+        ...
+        ValueError: Serialize every must be None or > 0
+
+        """
+        return self.__serialize_every
+
+    @serialize_every.setter
+    def serialize_every(self, serialize_every):
+        if serialize_every is not None:
+            if int(serialize_every) < 1:
+                raise ValueError("Serialize every must be None or > 0")
+            serialize_every = int(serialize_every)
+        self.__serialize_every = serialize_every
+
     @property
     def eqtests(self):
         return self.__eqtests
@@ -24,14 +24,14 @@
 # +----------------------------------------------------------------------------
 # | Global Imports
 # +----------------------------------------------------------------------------
-
+import threading
+import weakref
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
 # +----------------------------------------------------------------------------
-from pylstar.tools.Decorators import PylstarLogger
 
-@PylstarLogger
+
 class Letter(object):
     """
     A letter is a wrapper for a set of symbols. A word is made of letters.
@@ -44,16 +44,109 @@ class Letter(object):
     
     """
 
+    # letters are the most instantiated objects, they do not need a __dict__
+    __slots__ = ('__symbols', '__id', '__weakref__')
+
+    # canonical letters returned by Letter.get(), indexed by their set of symbols
+    _pool = weakref.WeakValueDictionary()
+
+    # integer identifiers of the letters, indexed by their set of symbols, and
+    # the set of symbols associated with each identifier. Only symbols are kept,
+    # letters themselves remain collectable once they are not referenced anymore
+    _ids = dict()
+    _symbols_by_id = []
+    # identifiers are allocated by the threads that submit words concurrently
+    _ids_lock = threading.Lock()
+
     def __init__(self, symbol = None, symbols = None):
-        self.symbols = set()
-        
+        all_symbols = []
         if symbol is not None:
-            self.symbols.add(symbol)
+            all_symbols.append(symbol)
         if symbols is not None:
-            self.symbols.update(symbols)
+            all_symbols.extend(symbols)
+        self.symbols = all_symbols
+
+    @staticmethod
+    def get(symbol = None, symbols = None):
+        """Returns the canonical letter made of the specified symbol(s).
+        Letters of an alphabet should be built with this method so that
+        comparing them only requires an identity check.
+
+        >>> from pylstar.Letter import Letter
+        >>> Letter.get("a") is Letter.get("a")
+        True
+        >>> Letter.get("a") == Letter("a")
+        True
+        >>> Letter.get("a") is Letter.get("b")
+        False
+        >>> Letter.get(symbols = ["a", "b"]) is Letter.get(symbols = ["b", "a"])
+        True
+
+        A letter without any symbol is the empty letter
+
+        >>> print(Letter.get())
+        EmptyLetter
+        >>> Letter.get() is Letter.get()
+        True
+        """
+        key = set()
+        if symbol is not None:
+            key.add(symbol)
+        if symbols is not None:
+            key.update(symbols)
+        key = frozenset(key)
+
+        letter = Letter._pool.get(key)
+        if letter is None:
+            letter = Letter(symbols = key)
+            Letter._pool[key] = letter
+        return letter
+
+    @property
+    def id(self):
+        """A small integer that identifies the symbols of the letter. Equal letters
+        share the same identifier, which remains valid for the life of the process.
+
+        >>> from pylstar.Letter import Letter
+        >>> Letter("a").id == Letter.get("a").id
+        True
+        >>> Letter("a").id == Letter("b").id
+        False
+        >>> Letter.from_id(Letter("a").id) is Letter.get("a")
+        True
+        """
+        if self.__id is None:
+            key = frozenset(self.symbols)
+            letter_id = Letter._ids.get(key)
+            if letter_id is None:
+                with Letter._ids_lock:
+                    # another thread may have allocated it in the meantime
+                    letter_id = Letter._ids.get(key)
+                    if letter_id is None:
+                        letter_id = len(Letter._symbols_by_id)
+                        Letter._symbols_by_id.append(key)
+                        Letter._ids[key] = letter_id
+            self.__id = letter_id
+        return self.__id
+
+    def __getstate__(self):
+        # identifiers only hold for the current process
+        return {'symbols': self.__symbols}
+
+    def __setstate__(self, state):
+        self.symbols = state['symbols']
+
+    @staticmethod
+    def from_id(letter_id):
+        """Returns the canonical letter identified by the specified integer"""
+        return Letter.get(symbols = Letter._symbols_by_id[letter_id])
 
     def __hash__(self):
-        return hash(frozenset(self.symbols))
+        # symbols are not expected to change once the letter is hashed
+        letter_id = self.__id
+        if letter_id is None:
+            letter_id = self.id
+        return letter_id
 
     def __eq__(self, other):
         """Two letters are equal iif their symbols are equals
@@ -68,10 +161,17 @@ class Letter(object):
         >>> la == Letter("a")
         True
         """
+        if self is other:
+            return True
         if not isinstance(other, Letter):
             return False
-        
-        return self.symbols == other.symbols
+
+        # equal symbols share the same identifier, read from the slots once computed
+        self_id = self.__id
+        other_id = other.__id
+        if self_id is None or other_id is None:
+            return self.id == other.id
+        return self_id == other_id
 
     def __ne__(self, other):
         """Two letters are not equal if their symbols are not equals
@@ -87,9 +187,16 @@ class Letter(object):
         False
         """
 
+        if self is other:
+            return False
         if not isinstance(other, Letter):
             return True
-        return self.symbols != other.symbols
+
+        self_id = self.__id
+        other_id = other.__id
+        if self_id is None or other_id is None:
+            return self.id != other.id
+        return self_id != other_id
     
     def __str__(self):
         return "Letter({})".format(self.name)
@@ -125,7 +232,7 @@ class Letter(object):
             symbols = []
             for l in letters:
                 symbols.extend(l.symbols)
-            return Letter(symbols=symbols)
+            return Letter.get(symbols=symbols)
 
         
         
@@ -134,19 +241,56 @@ class Letter(object):
 
     @property
     def symbols(self):
-        """Symbols that are represented by the letter"""
+        """Symbols that are represented by the letter, as a tuple without
+        duplicates ordered by their representation
+
+        >>> from pylstar.Letter import Letter
+        >>> Letter("a").symbols
+        ('a',)
+        >>> Letter(symbols = ["b", 1, "a", "b"]).symbols
+        ('a', 'b', 1)
+        """
         return self.__symbols
     
     @symbols.setter
-    def symbols(self, symbols):    
+    def symbols(self, symbols):
+        if symbols is not None:
+            symbols = tuple(symbols)
+            # a letter is almost always made of a single symbol
+            if len(symbols) > 1:
+                symbols = tuple(sorted(set(symbols), key = repr))
         self.__symbols = symbols
+        self.__id = None
 
         
-@PylstarLogger
 class EmptyLetter(Letter):
+    """The letter without any symbol. It is a singleton, also available
+    as EMPTY_LETTER.
+
+    >>> from pylstar.Letter import EmptyLetter, EMPTY_LETTER
+    >>> EmptyLetter() is EMPTY_LETTER
+    True
+    """
+
+    __slots__ = ()
+
+    # the single instance of the class
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EmptyLetter, cls).__new__(cls)
+        return cls._instance
 
     def __init__(self):
-        super(EmptyLetter, self).__init__()
+        # the shared instance is only initialized once
+        if not hasattr(self, '_Letter__symbols'):
+            super(EmptyLetter, self).__init__()
 
     def __str__(self):
         return "EmptyLetter"
+
+
+# the canonical empty letter, kept alive for the life of the process
+EMPTY_LETTER = EmptyLetter()
+Letter._pool[frozenset()] = EMPTY_LETTER
@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+
+# +---------------------------------------------------------------------------+
+# | pylstar : Implementation of the LSTAR Grammatical Inference Algorithm     |
+# +---------------------------------------------------------------------------+
+# | Copyright (C) 2015 Georges Bossert                                        |
+# | This program is free software: you can redistribute it and/or modify      |
+# | it under the terms of the GNU General Public License as published by      |
+# | the Free Software Foundation, either version 3 of the License, or         |
+# | (at your option) any later version.                                       |
+# |                                                                           |
+# | This program is distributed in the hope that it will be useful,           |
+# | but WITHOUT ANY WARRANTY; without even the implied warranty of            |
+# | MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              |
+# | GNU General Public License for more details.                              |
+# |                                                                           |
+# | You should have received a copy of the GNU General Public License         |
+# | along with this program. If not, see <http://www.gnu.org/licenses/>.      |
+# +---------------------------------------------------------------------------+
+# | @url      : https://github.com/gbossert/pylstar                           |
+# | @contact  : gbossert@miskin.fr                                            |
+# +---------------------------------------------------------------------------+
+
+# +----------------------------------------------------------------------------
+# | Global Imports
+# +----------------------------------------------------------------------------
+import logging
+import random
+import socket
+import threading
+import time
+
+# +----------------------------------------------------------------------------
+# | Pylstar Imports
+# +----------------------------------------------------------------------------
+from pylstar.tools.Decorators import PylstarLogger
+from pylstar.ActiveKnowledgeBase import ActiveKnowledgeBase
+from pylstar.NetworkConnectionPool import NetworkConnectionPool
+from pylstar.Letter import Letter, EMPTY_LETTER
+from pylstar.Word import Word
+
+
+@PylstarLogger
+class NetworkActiveKnowledgeBase(ActiveKnowledgeBase):
+    """An active knowledge base that submits words to a network server.
+    Each letter is sent as a message over a TCP connection and the reply
+    of the server is read as the output letter.
+
+    A session of the target is expected to be bound to a connection,
+    hence each word is played over its own connection. Words are
+    submitted concurrently over several connections if max_workers is
+    greater than 1, the number of connections simultaneously opened on
+    the target being bounded by max_connections if it is set. The options
+    set on the sockets can be changed with socket_options (see
+    NetworkConnectionPool), e.g. to size their buffers. If preconnect is
+    set, connections are established in the background before the words
+    need them, i.e. when the target is started and whenever a connection
+    is closed after its word.
+
+    Messages are newline-delimited by default (see encode_letter and
+    decode_response). A reply is read until it ends with end_of_response,
+    subclasses can override is_complete_response to implement another
+    framing of the replies (e.g. a length prefix). If the target reads its messages from a stream,
+    pipelined can be set so that all the letters of a word are sent at
+    once and their replies read afterwards, which costs a single round
+    trip per word.
+
+    >>> import socket
+    >>> import threading
+    >>> from pylstar.Letter import Letter
+    >>> from pylstar.Word import Word
+    >>> from pylstar.OutputQuery import OutputQuery
+    >>> from pylstar.NetworkActiveKnowledgeBase import NetworkActiveKnowledgeBase
+    >>> server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    >>> server.bind(("127.0.0.1", 0))
+    >>> server.listen(5)
+    >>> def serve_session(conn):
+    ...     for line in conn.makefile("rb"):
+    ...         conn.sendall(line.strip().upper() + b"\\n")
+    ...     conn.close()
+    >>> def serve():
+    ...     while True:
+    ...         (conn, _) = server.accept()
+    ...         session = threading.Thread(target = serve_session, args = (conn, ))
+    ...         session.daemon = True
+    ...         session.start()
+    >>> server_thread = threading.Thread(target = serve)
+    >>> server_thread.daemon = True
+    >>> server_thread.start()
+    >>> kbase = NetworkActiveKnowledgeBase("127.0.0.1", server.getsockname()[1])
+    >>> kbase.max_workers = 2
+    >>> queries = [OutputQuery(Word([Letter("a"), Letter("b")])), OutputQuery(Word([Letter("c")]))]
+    >>> kbase.resolve_queries(queries)
+    >>> [query.output_word for query in queries] == [Word([Letter("A"), Letter("B")]), Word([Letter("C")])]
+    True
+    >>> kbase.pipelined = True
+    >>> kbase.submit_word(Word([Letter("d"), Letter("e"), Letter("f")])) == Word([Letter("D"), Letter("E"), Letter("F")])
+    True
+
+    Sessions of this server hold no state, so connections can be kept
+    open to play the next words.
+
+    >>> kbase.preconnect = True
+    >>> kbase.start_target()
+    >>> kbase.submit_words([Word([Letter("j")]), Word([Letter("k")])]) == [Word([Letter("J")]), Word([Letter("K")])]
+    True
+    >>> kbase.stop_target()
+    >>> kbase.preconnect = False
+    >>> kbase.reset_connection = lambda sock: True
+    >>> [kbase.submit_word(Word([Letter(symbol)])) for symbol in "ghi"] == [Word([Letter(symbol)]) for symbol in "GHI"]
+    True
+    >>> kbase.stop_target()
+
+    """
+
+    # maximum number of distinct replies whose letter is memoized
+    MAX_DECODED_REPLIES = 4096
+
+    def __init__(self, target_host, target_port, timeout = 5, cache_file_path = None, max_connections = None, socket_options = None,
+                 max_retries = 0, retry_backoff = 0.1):
+        super(NetworkActiveKnowledgeBase, self).__init__(cache_file_path = cache_file_path)
+        self.target_host = target_host
+        self.target_port = target_port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        if socket_options is None:
+            socket_options = NetworkConnectionPool.DEFAULT_SOCKET_OPTIONS
+        self.socket_options = socket_options
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.pipelined = False
+        self.preconnect = False
+        self.end_of_response = b"\n"
+        self.__connection_pool = None
+        self.__connection_pool_lock = threading.Lock()
+        self.__encoded_letters = dict()
+        self.__decoded_replies = dict()
+        self.__preconnect_threads = []
+
+    def start(self):
+        """Starts the target, to be overwritten by subclasses that manage
+        the target process."""
+        pass
+
+    def stop(self):
+        """Stops the target, to be overwritten by subclasses that manage
+        the target process."""
+        pass
+
+    def start_target(self):
+        # the pool is settled before the words are dispatched to the workers
+        self.__ensure_connection_pool()
+        if self.preconnect:
+            nb_connections = self.max_workers
+            if self.max_connections is not None:
+                nb_connections = min(nb_connections, self.max_connections)
+            self.__open_connections_in_background(nb_connections)
+
+    def stop_target(self):
+        threads = self.__preconnect_threads
+        self.__preconnect_threads = []
+        for thread in threads:
+            thread.join()
+        self.close_connections()
+
+    def __open_connections_in_background(self, nb_connections):
+        thread = threading.Thread(target = self.connection_pool.open_idle_connections, args = (nb_connections, ))
+        thread.daemon = True
+        thread.start()
+        self.__preconnect_threads.append(thread)
+
+    def submit_word(self, word):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Submiting word '%s' to the network target", word)
+
+        pool = self.connection_pool
+        (sock, pooled) = pool.acquire()
+        try:
+            output_letters = self.__play_word(pool, sock, word)
+        except socket.error:
+            # the target may have closed a pooled connection while it was idle,
+            # the word is played once again over a new connection
+            if not pooled:
+                raise
+            (sock, pooled) = pool.acquire(reuse = False)
+            output_letters = self.__play_word(pool, sock, word)
+
+        # the session of a letter that timed out is lost with its connection,
+        # thus the whole word is played once again over a new connection
+        attempt = 0
+        while attempt < self.max_retries and self.__has_timed_out(output_letters):
+            delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+            self._logger.debug("The target did not answer in time, retrying in %.3f seconds", delay)
+            time.sleep(delay)
+            attempt += 1
+            (sock, pooled) = pool.acquire(reuse = False)
+            output_letters = self.__play_word(pool, sock, word)
+
+        return Word(letters = output_letters)
+
+    def __play_word(self, pool, sock, word):
+        """Plays the word over the connection, which is given back to the pool
+        afterwards. It is kept open if the session can be reset."""
+        try:
+            if self.pipelined:
+                output_letters = self._submit_pipelined_word(sock, word)
+            else:
+                output_letters = [self._submit_letter(sock, letter) for letter in word.letters]
+        except socket.error:
+            pool.on_disconnected(sock)
+            raise
+        except:
+            pool.release(sock, reusable = False)
+            raise
+
+        # a late reply to a letter that timed out would be read as the reply
+        # to a letter of the next word, thus such a connection is not reused
+        reusable = not self.__has_timed_out(output_letters) and self.reset_connection(sock)
+        pool.release(sock, reusable = reusable)
+        if not reusable and self.preconnect:
+            self.__open_connections_in_background(1)
+        return output_letters
+
+    def __has_timed_out(self, output_letters):
+        # the empty letter is a singleton, checking identities spares
+        # allocating an identifier to each letter decoded from a reply
+        return any(letter is EMPTY_LETTER for letter in output_letters)
+
+    def reset_connection(self, sock):
+        """Brings the session of the target attached to the specified connection
+        back to its initial state and returns True if it succeeded, in which case
+        the connection is kept open to play the next words. Sessions cannot be
+        reset by default, thus each connection is closed after its word."""
+        return False
+
+    def close_connections(self):
+        """Closes the idle connections to the target."""
+        if self.__connection_pool is not None:
+            self.__connection_pool.close()
+
+    @property
+    def connection_pool(self):
+        """The pool of connections to the target. A new pool is created
+        whenever the target address or the connection settings change."""
+        return self.__ensure_connection_pool()
+
+    def __ensure_connection_pool(self):
+        """Returns the pool of connections to the target, after creating it if
+        there is none or replacing it if its settings are outdated."""
+        # workers reach the pool concurrently, a single one of them creates it
+        with self.__connection_pool_lock:
+            pool = self.__connection_pool
+            if pool is None or pool.key != (self.target_host, self.target_port) \
+               or pool.timeout != self.timeout or pool.max_connections != self.max_connections \
+               or pool.socket_options != self.socket_options:
+                if pool is not None:
+                    pool.close()
+                pool = NetworkConnectionPool(self.target_host, self.target_port, self.timeout,
+                                             self.max_connections, self.socket_options)
+                self.__connection_pool = pool
+            return pool
+
+    def encode_letter(self, letter):
+        """Returns the message sent to the target for the specified letter,
+        its symbols followed by a newline. Messages are computed once per
+        letter, thus it must only depend on the letter."""
+        data = "".join(map(str, letter.symbols))
+        return (data + "\n").encode("utf-8")
+
+    def encode_word(self, word):
+        """Returns the messages sent to the target for the specified word"""
+        return b"".join([self._get_encoded_letter(letter) for letter in word.letters])
+
+    def _get_encoded_letter(self, letter):
+        try:
+            return self.__encoded_letters[letter.id]
+        except KeyError:
+            data = self.encode_letter(letter)
+            self.__encoded_letters[letter.id] = data
+            return data
+
+    def decode_response(self, data):
+        """Returns the output letters of the newline-delimited replies of the target
+
+        >>> from pylstar.NetworkActiveKnowledgeBase import NetworkActiveKnowledgeBase
+        >>> kbase = NetworkActiveKnowledgeBase("127.0.0.1", 3000)
+        >>> kbase.decode_response(b"DONE\\nERROR\\n") == [Letter("DONE"), Letter("ERROR")]
+        True
+
+        """
+        replies = data.split(self.end_of_response)[:-1]
+        return [self._get_decoded_reply(reply) for reply in replies]
+
+    def decode_reply(self, reply):
+        """Returns the output letter of a reply of the target, given as the bytes
+        it sent without end_of_response. Replies are decoded as text, surrounding
+        whitespaces being ignored, which subclasses can overwrite to read binary
+        replies. Letters are computed once per reply, thus it must only depend on
+        the reply.
+
+        >>> from pylstar.NetworkActiveKnowledgeBase import NetworkActiveKnowledgeBase
+        >>> kbase = NetworkActiveKnowledgeBase("127.0.0.1", 3000)
+        >>> kbase.decode_reply(b"DONE\\r") == Letter("DONE")
+        True
+
+        """
+        return Letter.get(reply.decode("utf-8").strip())
+
+    def _get_decoded_reply(self, reply):
+        try:
+            return self.__decoded_replies[reply]
+        except KeyError:
+            letter = self.decode_reply(reply)
+            # targets may send unique replies (e.g. session identifiers)
+            if len(self.__decoded_replies) < NetworkActiveKnowledgeBase.MAX_DECODED_REPLIES:
+                self.__decoded_replies[reply] = letter
+            return letter
+
+    def is_complete_response(self, data):
+        """Returns whether the data received from the target holds a whole reply,
+        which is the case once it ends with end_of_response.
+
+        >>> from pylstar.NetworkActiveKnowledgeBase import NetworkActiveKnowledgeBase
+        >>> kbase = NetworkActiveKnowledgeBase("127.0.0.1", 3000)
+        >>> kbase.is_complete_response(b"DON")
+        False
+        >>> kbase.is_complete_response(b"DONE\\n")
+        True
+
+        """
+        return data.endswith(self.end_of_response)
+
+    def _submit_pipelined_word(self, sock, word):
+        """Sends all the letters of the word at once and reads their replies. Letters
+        the target did not answer in time are associated with the empty letter."""
+        letters = word.letters
+        sock.sendall(self.encode_word(word))
+        try:
+            data = self._recv_all(sock, len(letters))
+        except socket.timeout:
+            self._logger.debug("The target did not answer all the letters in time")
+            return [EMPTY_LETTER] * len(letters)
+
+        output_letters = self.decode_response(data)[:len(letters)]
+        output_letters.extend([EMPTY_LETTER] * (len(letters) - len(output_letters)))
+        return output_letters
+
+    def _recv_all(self, sock, nb_replies):
+        """Reads from the socket until the specified number of replies were
+        received, within timeout seconds. An error is raised if the target
+        closed the connection."""
+        end_of_response = self.end_of_response
+        data = bytearray()
+        nb_received = 0
+        deadline = time.time() + self.timeout
+        try:
+            while True:
+                # a delimiter may span two chunks
+                start = max(0, len(data) - len(end_of_response) + 1)
+                chunk = sock.recv(4096)
+                if not chunk:
+                    raise socket.error("Connection closed by the target")
+                data.extend(chunk)
+                nb_received += data.count(end_of_response, start)
+                if nb_received >= nb_replies:
+                    return bytes(data)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise socket.timeout("Incomplete responses from the target")
+                sock.settimeout(remaining)
+        finally:
+            sock.settimeout(self.timeout)
+
+    def _submit_letter(self, sock, letter):
+        try:
+            return self._get_decoded_reply(self._send_and_receive(sock, letter))
+        except socket.timeout:
+            self._logger.debug("No response from the target to letter '%s'", letter)
+            return EMPTY_LETTER
+
+    def _send_and_receive(self, sock, letter):
+        """Sends the letter and returns the reply of the target, without
+        end_of_response, once it is complete (see is_complete_response). A
+        socket.timeout is raised if the reply is not complete after timeout
+        seconds."""
+        sock.sendall(self._get_encoded_letter(letter))
+        data = self._recv_response(sock)
+        if data.endswith(self.end_of_response):
+            return data[:-len(self.end_of_response)]
+        return data
+
+    def _recv_response(self, sock):
+        """Reads a reply of the target, the timeout bounds the whole reply
+        rather than each of its chunks."""
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise socket.error("Connection closed by the target")
+        if self.is_complete_response(chunk):
+            return chunk
+
+        data = bytearray(chunk)
+        deadline = time.time() + self.timeout
+        try:
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise socket.timeout("Incomplete response from the target")
+                sock.settimeout(remaining)
+                chunk = sock.recv(4096)
+                if not chunk:
+                    raise socket.error("Connection closed by the target")
+                data.extend(chunk)
+                if self.is_complete_response(data):
+                    return bytes(data)
+        finally:
+            sock.settimeout(self.timeout)
+
+    @property
+    def target_host(self):
+        """The host name or address of the target"""
+        return self.__target_host
+
+    @target_host.setter
+    def target_host(self, target_host):
+        if target_host is None:
+            raise Exception("Target host cannot be None")
+        self.__target_host = target_host
+
+    @property
+    def target_port(self):
+        """The TCP port of the target"""
+        return self.__target_port
+
+    @target_port.setter
+    def target_port(self, target_port):
+        if target_port is None:
+            raise Exception("Target port cannot be None")
+        self.__target_port = int(target_port)
+
+    @property
+    def max_connections(self):
+        """The maximum number of connections simultaneously opened on the
+        target, None if it is not bounded"""
+        return self.__max_connections
+
+    @max_connections.setter
+    def max_connections(self, max_connections):
+        if max_connections is not None:
+            if int(max_connections) < 1:
+                raise Exception("Max connections must be > 0")
+            max_connections = int(max_connections)
+        self.__max_connections = max_connections
+
+    @property
+    def socket_options(self):
+        """The options, as tuples of level, option and value, set on the
+        sockets before connecting to the target"""
+        return self.__socket_options
+
+    @socket_options.setter
+    def socket_options(self, socket_options):
+        if socket_options is None:
+            raise Exception("Socket options cannot be None")
+        self.__socket_options = tuple(tuple(socket_option) for socket_option in socket_options)
+
+    @property
+    def max_retries(self):
+        """The number of times a word is played once again if the target did not
+        answer one of its letters in time. Each retry waits a random delay below
+        retry_backoff seconds, doubled at every retry. Words are not retried by
+        default, since some targets do not answer every letter."""
+        return self.__max_retries
+
+    @max_retries.setter
+    def max_retries(self, max_retries):
+        if max_retries is None:
+            raise Exception("Max retries cannot be None")
+        if int(max_retries) < 0:
+            raise Exception("Max retries must be >= 0")
+        self.__max_retries = int(max_retries)
+
+    @property
+    def retry_backoff(self):
+        """The upper bound, in seconds, of the delay before the first retry of a word"""
+        return self.__retry_backoff
+
+    @retry_backoff.setter
+    def retry_backoff(self, retry_backoff):
+        if retry_backoff is None:
+            raise Exception("Retry backoff cannot be None")
+        if retry_backoff < 0:
+            raise Exception("Retry backoff must be >= 0")
+        self.__retry_backoff = retry_backoff
+
+    @property
+    def preconnect(self):
+        """Whether connections to the target are established in the background
+        before the words need them"""
+        return self.__preconnect
+
+    @preconnect.setter
+    def preconnect(self, preconnect):
+        if preconnect is None:
+            raise Exception("Preconnect cannot be None")
+        self.__preconnect = bool(preconnect)
+
+    @property
+    def end_of_response(self):
+        """The bytes that terminate each reply of the target"""
+        return self.__end_of_response
+
+    @end_of_response.setter
+    def end_of_response(self, end_of_response):
+        if not end_of_response:
+            raise Exception("End of response cannot be empty")
+        self.__end_of_response = end_of_response
+
+    @property
+    def pipelined(self):
+        """Whether the letters of a word are sent at once rather than
+        waiting for the reply to each letter before sending the next one"""
+        return self.__pipelined
+
+    @pipelined.setter
+    def pipelined(self, pipelined):
+        if pipelined is None:
+            raise Exception("Pipelined cannot be None")
+        self.__pipelined = bool(pipelined)
+
+    @property
+    def timeout(self):
+        """The number of seconds to wait for the target to answer a letter"""
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        if timeout is None:
+            raise Exception("Timeout cannot be None")
+        self.__timeout = timeout
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# +---------------------------------------------------------------------------+
+# | pylstar : Implementation of the LSTAR Grammatical Inference Algorithm     |
+# +---------------------------------------------------------------------------+
+# | Copyright (C) 2015 Georges Bossert                                        |
+# | This program is free software: you can redistribute it and/or modify      |
+# | it under the terms of the GNU General Public License as published by      |
+# | the Free Software Foundation, either version 3 of the License, or         |
+# | (at your option) any later version.                                       |
+# |                                                                           |
+# | This program is distributed in the hope that it will be useful,           |
+# | but WITHOUT ANY WARRANTY; without even the implied warranty of            |
+# | MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              |
+# | GNU General Public License for more details.                              |
+# |                                                                           |
+# | You should have received a copy of the GNU General Public License         |
+# | along with this program. If not, see <http://www.gnu.org/licenses/>.      |
+# +---------------------------------------------------------------------------+
+# | @url      : https://github.com/gbossert/pylstar                           |
+# | @contact  : gbossert@miskin.fr                                            |
+# +---------------------------------------------------------------------------+
+
+# +----------------------------------------------------------------------------
+# | Global Imports
+# +----------------------------------------------------------------------------
+import collections
+import socket
+import threading
+
+# +----------------------------------------------------------------------------
+# | Pylstar Imports
+# +----------------------------------------------------------------------------
+from pylstar.tools.Decorators import PylstarLogger
+
+
+@PylstarLogger
+class NetworkConnectionPool(object):
+    """A pool of connections to a network target, identified by its host and port.
+
+    A connection is borrowed with acquire() and given back with release(), which
+    keeps it open for the next borrower if it can be reused and closes it
+    otherwise. If max_connections is set, it bounds the number of connections
+    simultaneously opened by the pool, either borrowed or idle: an idle
+    connection is closed to make room for a new one if needed, and acquire()
+    blocks while max_connections connections are borrowed.
+
+    Socket options (tuples of level, option and value) are set on the
+    connections before they are opened. By default, Nagle's algorithm is
+    disabled since letters are small messages that wait for a reply, and
+    keepalive probes are enabled for connections that stay in the pool.
+
+    >>> import socket
+    >>> from pylstar.NetworkConnectionPool import NetworkConnectionPool
+    >>> server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    >>> server.bind(("127.0.0.1", 0))
+    >>> server.listen(5)
+    >>> pool = NetworkConnectionPool("127.0.0.1", server.getsockname()[1], timeout = 5, max_connections = 2)
+    >>> pool.key == ("127.0.0.1", server.getsockname()[1])
+    True
+    >>> (sock, pooled) = pool.acquire()
+    >>> pooled
+    False
+    >>> sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY) != 0
+    True
+    >>> pool.release(sock, reusable = True)
+    >>> (sock, pooled) = pool.acquire()
+    >>> pooled
+    True
+    >>> (new_sock, pooled) = pool.acquire(reuse = False)
+    >>> pool.release(sock, reusable = True)
+    >>> pool.nb_open_connections
+    2
+    >>> (other_sock, pooled) = pool.acquire(reuse = False)
+    >>> pool.nb_open_connections
+    2
+    >>> pool.release(new_sock, reusable = False)
+    >>> pool.release(other_sock, reusable = False)
+    >>> pool.nb_open_connections
+    0
+    >>> pool.close()
+    >>> server.close()
+
+    """
+
+    DEFAULT_SOCKET_OPTIONS = (
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    )
+
+    def __init__(self, target_host, target_port, timeout, max_connections = None, socket_options = None):
+        if target_host is None:
+            raise Exception("Target host cannot be None")
+        if target_port is None:
+            raise Exception("Target port cannot be None")
+        if max_connections is not None and int(max_connections) < 1:
+            raise Exception("Max connections must be > 0")
+
+        self.target_host = target_host
+        self.target_port = int(target_port)
+        self.timeout = timeout
+        if max_connections is not None:
+            max_connections = int(max_connections)
+        self.max_connections = max_connections
+        if socket_options is None:
+            socket_options = NetworkConnectionPool.DEFAULT_SOCKET_OPTIONS
+        self.socket_options = tuple(socket_options)
+        self.__idle_connections = collections.deque()
+        # number of connections opened by the pool, either borrowed or idle
+        self.__nb_open_connections = 0
+        self.__condition = threading.Condition(threading.Lock())
+
+    @property
+    def key(self):
+        """The address of the target, which identifies the pool"""
+        return (self.target_host, self.target_port)
+
+    @property
+    def nb_open_connections(self):
+        """The number of connections opened by the pool, either borrowed or idle"""
+        return self.__nb_open_connections
+
+    def acquire(self, reuse = True):
+        """Returns an idle connection of the pool, unless reuse is False, or a new one,
+        along with whether the connection was idle in the pool."""
+        idle_sock = None
+        with self.__condition:
+            while True:
+                if reuse and len(self.__idle_connections) > 0:
+                    return (self.__idle_connections.popleft(), True)
+                if not self.__is_full():
+                    break
+                if len(self.__idle_connections) > 0:
+                    # the idle connection gives its place to the new one
+                    idle_sock = self.__idle_connections.popleft()
+                    self.__nb_open_connections -= 1
+                    break
+                self.__condition.wait()
+            self.__nb_open_connections += 1
+
+        if idle_sock is not None:
+            idle_sock.close()
+        return (self.__open_reserved_connection(), False)
+
+    def release(self, sock, reusable):
+        """Gives the connection back to the pool. It is kept open for the next
+        borrower if it is reusable and closed otherwise."""
+        with self.__condition:
+            if reusable:
+                self.__idle_connections.append(sock)
+            else:
+                self.__nb_open_connections -= 1
+            self.__condition.notify()
+        if not reusable:
+            sock.close()
+
+    def open_idle_connections(self, nb_connections):
+        """Opens up to the specified number of connections and keeps them idle in the
+        pool, so that the next borrowers do not wait for the connections to be
+        established. Fewer connections are opened if the pool is full."""
+        for i in range(nb_connections):
+            with self.__condition:
+                if self.__is_full():
+                    return
+                self.__nb_open_connections += 1
+            try:
+                sock = self.__open_reserved_connection()
+            except socket.error as e:
+                self._logger.debug("Cannot open a connection to %s:%d: %s", self.target_host, self.target_port, e)
+                return
+            self.release(sock, reusable = True)
+
+    def on_disconnected(self, sock):
+        """Drops a borrowed connection that the target closed"""
+        self._logger.debug("Connection to %s:%d was lost", self.target_host, self.target_port)
+        self.release(sock, reusable = False)
+
+    def close(self):
+        """Closes the idle connections of the pool"""
+        with self.__condition:
+            idle_connections = list(self.__idle_connections)
+            self.__idle_connections.clear()
+            self.__nb_open_connections -= len(idle_connections)
+            self.__condition.notify_all()
+        for sock in idle_connections:
+            sock.close()
+
+    def __is_full(self):
+        return self.max_connections is not None and self.__nb_open_connections >= self.max_connections
+
+    def __open_reserved_connection(self):
+        """Opens a connection once it was counted in the open connections,
+        which is uncounted if the connection cannot be established."""
+        try:
+            return self.__open_connection()
+        except:
+            with self.__condition:
+                self.__nb_open_connections -= 1
+                self.__condition.notify()
+            raise
+
+    def __open_connection(self):
+        """Connects to the first reachable address of the target, either IPv4 or
+        IPv6, like socket.create_connection() but with the socket options set
+        before connecting."""
+        error = None
+        for (family, socket_type, proto, _, address) in socket.getaddrinfo(self.target_host, self.target_port, 0, socket.SOCK_STREAM):
+            sock = socket.socket(family, socket_type, proto)
+            sock.settimeout(self.timeout)
+            try:
+                for (level, option, value) in self.socket_options:
+                    sock.setsockopt(level, option, value)
+                sock.connect(address)
+                return sock
+            except socket.error as e:
+                sock.close()
+                error = e
+            except:
+                sock.close()
+                raise
+        if error is not None:
+            raise error
+        raise socket.error("No address found for {}:{}".format(self.target_host, self.target_port))
@@ -25,18 +25,16 @@
 # | Global Imports
 # +----------------------------------------------------------------------------
 import collections
-import itertools
+import logging
     
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
 # +----------------------------------------------------------------------------
 from pylstar.tools.Decorators import PylstarLogger
-from pylstar.Letter import EmptyLetter
+from pylstar.Letter import EmptyLetter, EMPTY_LETTER
 from pylstar.Word import Word
 from pylstar.OutputQuery import OutputQuery
-from pylstar.automata.State import State
 from pylstar.automata.Automata import Automata
-from pylstar.automata.Transition import Transition
 
 
 
@@ -65,6 +63,7 @@ class ObservationTable(object):
         self.S = []
         self.SA = []
         self.ot_content = dict()
+        self.__reset_checks()
         
     def initialize(self):        
         self._logger.debug("Initialization of the observation table""")
@@ -78,13 +77,14 @@ class ObservationTable(object):
         self.S = []
         self.SA = []
         self.ot_content = dict()
+        self.__reset_checks()
 
         # creates a word for each input letter and register it in D
         for letter in self.input_letters:
             self.__add_word_in_D(Word([letter]))
 
         # creates a word that contains an EmptyLetter and registers it in S
-        self.__add_word_in_S(Word([EmptyLetter()]))
+        self.__add_word_in_S(Word([EMPTY_LETTER]))
     
         #for letter in self.input_letters:
         #     self.__add_word_in_SA(Word([letter]))
@@ -191,25 +191,36 @@ class ObservationTable(object):
         """
         self._logger.debug("Computes if the observation table is consistent.")
 
-        # find all rows in S
-        rows_in_S = {s: self.__get_row(s) for s in self.S}
-
-        # identify all equivalent rows in S
-        S_with_same_rows = collections.defaultdict(list)
-        for word_in_s, row_s in rows_in_S.items():
-            S_with_same_rows[','.join([str(w) for w in row_s])].append(word_in_s)
-
-        # check all equivalent in S are also equivalent in SA for each
-        for row_in_S, eq_words_in_S in S_with_same_rows.items():
-            if len(eq_words_in_S) > 1:
-                for pair_eq_words_in_S in itertools.combinations(eq_words_in_S, 2):
-                    inconsistency = self.__is_prefixes_equivalent(pair_eq_words_in_S)
-                    if inconsistency is not None:
-                        suffix, inconsistency_detail = inconsistency
-                        return ((pair_eq_words_in_S, suffix), inconsistency_detail)
+        # couples of words that were both found consistent with the current D
+        # remain consistent, only the couples with a new word need a check
+        self.__update_checks()
+        consistent_S = self.__consistent_S
+        if all(word_in_s in consistent_S for word_in_s in self.S):
+            return None
+
+        # identify all equivalent rows in S by bucketing them on their content
+        S_with_same_rows = collections.OrderedDict()
+        for word_in_s in self.S:
+            S_with_same_rows.setdefault(self.__get_row_key(word_in_s), []).append(word_in_s)
+
+        # check all equivalent in S are also equivalent in SA for each. Equivalence
+        # is transitive, so each word is only compared with the first of its bucket
+        extension_row_keys = dict()
+        for eq_words_in_S in S_with_same_rows.values():
+            first_word_in_s = eq_words_in_S[0]
+            for word_in_s in eq_words_in_S[1:]:
+                if first_word_in_s in consistent_S and word_in_s in consistent_S:
+                    continue
+                pair_eq_words_in_S = (first_word_in_s, word_in_s)
+                inconsistency = self.__is_prefixes_equivalent(pair_eq_words_in_S, extension_row_keys)
+                if inconsistency is not None:
+                    suffix, inconsistency_detail = inconsistency
+                    return ((pair_eq_words_in_S, suffix), inconsistency_detail)
+
+        consistent_S.update(self.S)
         return None
 
-    def __is_prefixes_equivalent(self, eq_words_in_S):
+    def __is_prefixes_equivalent(self, eq_words_in_S, extension_row_keys = None):
         """This method checks that the specified prefixes are equivalent.
 
         It returns None, if all the prefixes share the same row value given any
@@ -221,19 +232,38 @@ class ObservationTable(object):
         if len(eq_words_in_S) < 2:
             raise Exception("At least two words must be provided")
 
-        self._logger.debug("Checking if words '{}' are equivalents".format(','.join([str(s) for s in eq_words_in_S])))
-
-        for input_letter in self.input_letters:
-            initial_suffixed_word = Word(eq_words_in_S[0].letters + [input_letter])
-            for eq_word_in_S in eq_words_in_S[1:]:                
-                eq_suffixed_word = Word(eq_word_in_S.letters + [input_letter])
-                for word_in_D in self.D:
-                    self._logger.debug(type(word_in_D))
-                    if self.ot_content[word_in_D][eq_suffixed_word] !=  self.ot_content[word_in_D][initial_suffixed_word]:
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Checking if words '%s' are equivalents", ','.join([str(s) for s in eq_words_in_S]))
+
+        if extension_row_keys is None:
+            extension_row_keys = dict()
+        rows = [self.__get_extension_row_keys(word, extension_row_keys) for word in eq_words_in_S]
+
+        for (i_letter, input_letter) in enumerate(self.input_letters):
+            initial_row = rows[0][i_letter]
+            for eq_rows in rows[1:]:
+                # whole rows are compared at once, the distinguishing column
+                # is only searched for if they differ
+                eq_row = eq_rows[i_letter]
+                if eq_row == initial_row:
+                    continue
+                for (word_in_D, initial_cel, eq_cel) in zip(self.D, initial_row, eq_row):
+                    if initial_cel != eq_cel:
                         return (input_letter, word_in_D)
                 
         return None
 
+    def __get_extension_row_keys(self, word, extension_row_keys):
+        """Returns the row keys of the specified word extended with each input
+        letter. They are memoized in extension_row_keys, which must be dropped
+        once the table changes."""
+        row_keys = extension_row_keys.get(word)
+        if row_keys is None:
+            letters = word.letters
+            row_keys = [self.__get_row_key(Word(letters + [input_letter])) for input_letter in self.input_letters]
+            extension_row_keys[word] = row_keys
+        return row_keys
+
     def add_counterexample(self, input_word, output_word):
         """This method register the specified counterexample in the observation table.
 
@@ -323,14 +353,30 @@ class ObservationTable(object):
         if len(input_word) != len(output_word):
             raise Exception("Output word must have the same length then input word")
 
-        for len_prefix in range(1, len(input_word)+1):
-            prefix_input = Word(input_word.letters[:len_prefix])
+        prefixes = [Word(input_word.letters[:len_prefix]) for len_prefix in range(1, len(input_word)+1)]
+        self.__prefetch_rows([prefix for prefix in prefixes if prefix not in self.S])
+
+        for prefix_input in prefixes:
             if prefix_input not in self.S:
                 if prefix_input in self.SA:
                     self.remove_row(prefix_input)
 
                 self.__add_word_in_S(prefix_input)
 
+    def __prefetch_rows(self, words):
+        """Resolves at once the queries needed to register the specified words
+        in S, including the rows of their one-letter extensions, so that
+        registering the words one after the other only hits the knowledge base."""
+
+        queries = []
+        for word in words:
+            for input_letter in self.input_letters:
+                extended_word = Word(word.letters + [input_letter])
+                queries.extend([OutputQuery(extended_word + word_in_D) for word_in_D in self.D])
+            queries.extend([OutputQuery(word + word_in_D) for word_in_D in self.D])
+        if len(queries) > 0:
+            self.__execute_queries(queries)
+
     def remove_row(self, row):
         if row is None:
             raise Exception("Row cannot be None")
@@ -338,6 +384,8 @@ class ObservationTable(object):
             self.S.remove(row)
         if row in self.SA:
             self.SA.remove(row)
+        self.__closed_SA.discard(row)
+        self.__consistent_S.discard(row)
 
         for word_in_D in self.D:
             cel = self.ot_content[word_in_D]
@@ -540,15 +588,18 @@ class ObservationTable(object):
         """
         self._logger.debug("Computes if the observation table is closed")
 
+        # rows of SA that had an equivalent in S for the current D still have one
+        self.__update_checks()
+        rows_in_S = None
         for sa in self.SA:
-            row_sa = self.__get_row(sa)
-            found = False
-            for s in self.S:
-                if self.__get_row(s) == row_sa:
-                    found = True
-                    break
-            if not found :
+            if sa in self.__closed_SA:
+                continue
+            # rows of S are only hashed if a row of SA must be looked up
+            if rows_in_S is None:
+                rows_in_S = set(self.__get_row_key(s) for s in self.S)
+            if self.__get_row_key(sa) not in rows_in_S:
                 return False
+            self.__closed_SA.add(sa)
         return True
 
     def close_table(self):
@@ -610,21 +661,36 @@ class ObservationTable(object):
         
         """
 
+        self.__update_checks()
+        rows_in_S = set(self.__get_row_key(word_in_s) for word_in_s in self.S)
         for word_in_sa in self.SA:
-            row_sa = self.__get_row(word_in_sa)
-            found = False
-            for word_in_s in self.S:
-                row_s = self.__get_row(word_in_s)
-                if row_s == row_sa:
-                    found = True
-                    break
-            if not found:
-                self._logger.debug("Row attached to SA '{}' ({}) could not be found in S".format(word_in_sa, row_sa))
+            if word_in_sa in self.__closed_SA:
+                continue
+            row_sa = self.__get_row_key(word_in_sa)
+            if row_sa not in rows_in_S:
+                self._logger.debug("Row attached to SA '%s' (%s) could not be found in S", word_in_sa, row_sa)
                 self.SA.remove(word_in_sa)
                 self.__add_word_in_S(word_in_sa)
+                rows_in_S.add(row_sa)
+            else:
+                self.__closed_SA.add(word_in_sa)
         
         self._logger.debug("Closing the observation table.")
 
+    def __reset_checks(self):
+        """Forgets which rows were found closed or consistent"""
+        self.__checked_D = list(self.D)
+        self.__closed_SA = set()
+        self.__consistent_S = set()
+
+    def __update_checks(self):
+        """Previous closedness and consistency checks only hold as long as
+        the columns of the table are the same. Rows are only added to S
+        and SA between two changes of D, so the words found closed or
+        consistent stay so until then."""
+        if self.__checked_D != self.D:
+            self.__reset_checks()
+
     def __get_row(self, row_name):
         """This method returns the specified row
 
@@ -676,15 +742,14 @@ class ObservationTable(object):
         if row_name is None:
             raise Exception("Row_name cannot be None")
 
-        row = []
+        ot_content = self.ot_content
+        cels = [ot_content[word_in_D] for word_in_D in self.D]
+        return [cel[row_name] for cel in cels if row_name in cel]
 
-        for word_in_D in self.D:
-            cel = self.ot_content[word_in_D]
-            
-            for r,v in cel.items():
-                if r == row_name:
-                    row.append(v)
-        return row
+    def __get_row_key(self, row_name):
+        """Returns a hashable value of the specified row, two rows being
+        equivalent iff their keys are equal."""
+        return tuple(self.__get_row(row_name))
         
         
 
@@ -730,16 +795,18 @@ class ObservationTable(object):
         if word in self.ot_content.keys():
             raise Exception("Word '{}' is already registered in the content of the observation table".format(word))
 
-        self._logger.debug("Registering word '{}' in D".format(word))
+        self._logger.debug("Registering word '%s' in D", word)
         self.D.append(word)
 
         # computes the value of all existing S and SA for the newly inserted word
         cels = dict()
 
-        for word_in_S_or_SA in self.S + self.SA:
-            # formulates a new OutputQuery and executes it
-            output_query = OutputQuery(word_in_S_or_SA + word)
-            self.__execute_query(output_query)
+        # formulates a new OutputQuery for each of them and executes them
+        words_in_S_and_SA = self.S + self.SA
+        output_queries = [OutputQuery(word_in_S_or_SA + word) for word_in_S_or_SA in words_in_S_and_SA]
+        self.__execute_queries(output_queries)
+
+        for word_in_S_or_SA, output_query in zip(words_in_S_and_SA, output_queries):
             if not output_query.is_queried():
                 raise Exception("Query '{}' could not be queried".format(output_query))
             cels[word_in_S_or_SA] = output_query.output_word.last_letter()
@@ -775,19 +842,19 @@ class ObservationTable(object):
         if word in self.SA:
             raise Exception("Word '{}' is already registered in SA".format(word))
 
-        self._logger.debug("Registering word '{}' in S".format(word))
+        self._logger.debug("Registering word '%s' in S", word)
 
         self.S.append(word)
 
-        for word_in_D in self.D:
+        # formulates a new OutputQuery for each word in D and execute them
+        output_queries = [OutputQuery(word + word_in_D) for word_in_D in self.D]
+        self.__execute_queries(output_queries)
+
+        for word_in_D, output_query in zip(self.D, output_queries):
 
             cel = self.ot_content[word_in_D]
             # if word in cel.keys():
             #     raise Exception("Word '{}' already exists in observation table with D='{}'".format(word, word_in_D))
-            # formulates a new OutputQuery and execute it            
-            output_query = OutputQuery(word + word_in_D)
-            self._logger.debug("Execute query : {}".format(output_query))
-            self.__execute_query(output_query)
             if not output_query.is_queried():
                 raise Exception("Query '{}' could not be queried".format(output_query))
 
@@ -798,7 +865,7 @@ class ObservationTable(object):
                 new_word = Word([input_letter])
             else:
                 new_word = word + Word([input_letter])
-            self._logger.debug("Adding word: {}".format(new_word))            
+            self._logger.debug("Adding word: %s", new_word)
             if new_word not in self.S:
                 self.__add_word_in_SA(new_word)
 
@@ -827,43 +894,46 @@ class ObservationTable(object):
         if word in self.S:
             raise Exception("Word '{}' is already registered in S".format(word))
 
-        self._logger.debug("Registering word '{}' in SA".format(word))
+        self._logger.debug("Registering word '%s' in SA", word)
 
         self.SA.append(word)
 
         for word_in_D in self.D:
-            cel = self.ot_content[word_in_D]
-            if word in cel.keys():
+            if word in self.ot_content[word_in_D].keys():
                 raise Exception("Word '{}' already exists in observation table with D='{}'".format(word, word_in_D))
-            # formulates a new OutputQuery and executes it
-            output_query = OutputQuery(word + word_in_D)
-            self._logger.debug("Execute query : {}".format(output_query))            
-            self.__execute_query(output_query)
+
+        # formulates a new OutputQuery for each word in D and executes them
+        output_queries = [OutputQuery(word + word_in_D) for word_in_D in self.D]
+        self.__execute_queries(output_queries)
+
+        for word_in_D, output_query in zip(self.D, output_queries):
             if not output_query.is_queried():
                 raise Exception("Query '{}' could not be queries".format(output_query))
 
-            cel[word] = output_query.output_word.last_letter()
-        
-    def __execute_query(self, query):
-        """This method triggers the execution of the specified query.
+            self.ot_content[word_in_D][word] = output_query.output_word.last_letter()
         
-        An exception is raised if the query is None or if its execution failed
+    def __execute_queries(self, queries):
+        """This method triggers the execution of the specified queries as a single batch.
+
+        An exception is raised if queries is None. Queries that could not be executed
+        are left unqueried.
 
         >>> from pylstar.ObservationTable import ObservationTable
         >>> from pylstar.KnowledgeBase import KnowledgeBase
         >>> kbase = KnowledgeBase()
         >>> oTable = ObservationTable([], knowledge_base = kbase)
-        >>> oTable._ObservationTable__execute_query(None)
+        >>> oTable._ObservationTable__execute_queries(None)
         Traceback (most recent call last):
         ...
-        Exception: Query cannot be None
-        
+        Exception: Queries cannot be None
+
         """
-        if query is None:
-            raise Exception("Query cannot be None")
+        if queries is None:
+            raise Exception("Queries cannot be None")
 
+        self._logger.debug("Execute %d queries", len(queries))
         try:
-            self.knowledge_base.resolve_query(query)
+            self.knowledge_base.resolve_queries(queries)
         except Exception as e:
             self._logger.error(e, exc_info=True)
 
@@ -950,35 +1020,28 @@ class ObservationTable(object):
         
         """
 
-        states = []
-        transitions = []
         initial_state = None
-        words_and_states = []
-        long_state_name_to_states = dict()        
+        words_of_states = []
+        row_key_to_states = dict()
         
-        # find all rows in S
-        rows_in_S = [(s, self.__get_row(s)) for s in self.S]
+        # words made of the empty letter and of each input letter are shared by all the states
+        epsilon_word = Word([EMPTY_LETTER])
+        input_words = [Word([input_letter]) for input_letter in self.input_letters]
 
-        # get all unique rows
+        # get all unique rows of S, identified by their row key
         S_with_same_rows = collections.OrderedDict()
-        for word_in_s, row_s in rows_in_S:
-            key = ','.join([str(w) for w in row_s])
-            if key not in S_with_same_rows.keys():
-                S_with_same_rows[key] = list()
-            S_with_same_rows[key].append(word_in_s)        
-
-        # build the list of states of the hypothesis (and identify the initial state)
-        for long_state_name, words_in_S in S_with_same_rows.items():
-            state_name = str(len(states)) #''.join(long_state_name.replace("Letter(", "").replace(')', ''))
-            state = State(name = state_name)
-            states.append(state)
-
-            words_and_states.append((words_in_S[0], state))
-            long_state_name_to_states[long_state_name] = state
+        for word_in_s in self.S:
+            S_with_same_rows.setdefault(self.__get_row_key(word_in_s), []).append(word_in_s)
+
+        # each unique row is a state of the hypothesis identified by its index (and identify the initial state)
+        for row_key, words_in_S in S_with_same_rows.items():
+            state = len(words_of_states)
+            words_of_states.append(words_in_S[0])
+            row_key_to_states[row_key] = state
             
             # check if its the initial state
-            epsilon_word_found = Word([EmptyLetter()]) in words_in_S
-            self._logger.debug("state  :{} , {} / {}".format(long_state_name, words_in_S, epsilon_word_found))
+            epsilon_word_found = epsilon_word in words_in_S
+            self._logger.debug("state  :%s , %s / %s", row_key, words_in_S, epsilon_word_found)
             
             if initial_state is None and epsilon_word_found:
                 initial_state = state
@@ -988,35 +1051,24 @@ class ObservationTable(object):
         if initial_state is None:
             raise Exception("Can't find any initial state")
 
-        # computes the transitions for each state of the automata
-        for word, state in words_and_states:
+        # computes the output state and the output letter of each state for each input letter
+        next_states = []
+        output_letters = []
+        extension_row_keys = dict()
+        for word in words_of_states:
 
-            for input_letter in self.input_letters:
+            state_next_states = []
+            for (i_letter, output_row_key) in enumerate(self.__get_extension_row_keys(word, extension_row_keys)):
+                output_state = row_key_to_states.get(output_row_key)
+                if output_state is None:
+                    raise Exception("Cannot find a state with following name : '{}' (reached from '{}' with '{}')".format(
+                        ','.join([str(w) for w in output_row_key]), word, self.input_letters[i_letter]))
+                state_next_states.append(output_state)
 
-                # computes the output state
-                new_word = word + Word([input_letter])
-                row_new_word = self.__get_row(new_word)
+            next_states.append(state_next_states)
+            output_letters.append([self.ot_content[input_word][word] for input_word in input_words])
 
-                output_state_name = ','.join([str(w) for w in row_new_word])
-                if output_state_name not in long_state_name_to_states.keys():
-                    for x in long_state_name_to_states.keys():
-                        self._logger.debug(x)
-                
-                    raise Exception("Cannot find a state with following name : '{}'".format(output_state_name))
-
-                output_state = long_state_name_to_states[output_state_name]
-                output_letter = self.ot_content[Word([input_letter])][word]
-
-                transition_name = "t{}".format(len(transitions))
-                transition = Transition(name = transition_name,
-                                        output_state = output_state,
-                                        input_letter = input_letter,
-                                        output_letter = output_letter)
-                state.transitions.append(transition)
-                transitions.append(transition)
-                
-                                                    
-        return Automata(initial_state = initial_state)
+        return Automata.create_from_tables(next_states, output_letters, self.input_letters, initial_state = initial_state)
 
     def __str__(self):
         result = []
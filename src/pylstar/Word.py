@@ -24,7 +24,7 @@
 # +----------------------------------------------------------------------------
 # | Global Imports
 # +----------------------------------------------------------------------------
-
+import array
 
 # +----------------------------------------------------------------------------
 # | Pylstar Imports
@@ -52,17 +52,56 @@ class Word(object):
         if normalize:
             self.letters = letters
         else:
-            self.letters = []
-            for l in letters:
-                self.letters.append(l)
+            self.__hash = None
+            self.__ids = None
+            self.__letters = list(letters)
 
     def __hash__(self):
-        return hash(repr(self))
+        # letters are not expected to change once the word is hashed
+        if self.__hash is None:
+            self.__hash = hash(tuple(self.ids))
+        return self.__hash
+
+    @property
+    def ids(self):
+        """The identifiers of the letters of the word (see Letter.id) packed
+        in an array. Two words are equal iff their identifiers are equal.
+
+        >>> from pylstar.Word import Word
+        >>> from pylstar.Letter import Letter
+        >>> Word([Letter("a"), Letter("b")]).ids == Word([Letter("a"), Letter("b")]).ids
+        True
+        >>> Word([Letter("a"), Letter("b")]).ids == Word([Letter("b"), Letter("a")]).ids
+        False
+        """
+        ids = self.__ids
+        # letters can still be appended to a word that is being built
+        if ids is None or len(ids) != len(self.__letters):
+            ids = array.array('i', [letter.id for letter in self.__letters])
+            self.__ids = ids
+        return ids
     
+    def __getstate__(self):
+        # hashes and identifiers only hold for the current process
+        state = dict(self.__dict__)
+        state['_Word__hash'] = None
+        state['_Word__ids'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Word):
             return False
-        return self.letters == other.letters
+        if len(self.__letters) != len(other.__letters):
+            return False
+        # words that were both hashed can be told apart without visiting their letters
+        if self.__hash is not None and other.__hash is not None and self.__hash != other.__hash:
+            return False
+        return self.ids == other.ids
 
     def __ne__(self, other):
         return not (self == other)
@@ -112,10 +151,10 @@ class Word(object):
         if not isinstance(other, Word):
             raise Exception("Only two words can be added")
 
-        if len(self.letters) >= 1 and isinstance(self.letters[0], EmptyLetter):
-            return Word(self.letters[1:] + other.letters)
+        if len(self.__letters) >= 1 and isinstance(self.__letters[0], EmptyLetter):
+            return Word(self.__letters[1:] + other.__letters)
             
-        return Word(self.letters + other.letters)
+        return Word(self.__letters + other.__letters)
 
     @property
     def letters(self):
@@ -130,6 +169,6 @@ class Word(object):
         if len(letters) > 1 and isinstance(letters[0], EmptyLetter):
             letters = letters[1:]
         
-        self.__letters = []        
-        for letter in letters:            
-            self.__letters.append(letter)
+        self.__hash = None
+        self.__ids = None
+        self.__letters = list(letters)
@@ -32,6 +32,7 @@
 from pylstar.tools.Decorators import PylstarLogger
 from pylstar.Word import Word
 from pylstar.automata.State import State
+from pylstar.automata.Transition import Transition
 
 
 @PylstarLogger
@@ -98,7 +99,7 @@ class Automata(object):
         else:
             current_state = starting_state
 
-        self._logger.debug("Playing word '{}'".format(input_word))
+        self._logger.debug("Playing word '%s'", input_word)
 
         output_letters = []
         visited_states = []
@@ -122,30 +123,69 @@ class Automata(object):
         """
 
         states = []
-        toAnalyze = []
-        toAnalyze.append(self.initial_state)
+        if self.initial_state is None:
+            return states
+
+        # names of the states already in states or in toAnalyze
+        discoveredNames = set([self.initial_state.name])
+        toAnalyze = [self.initial_state]
         while (len(toAnalyze) > 0):
             currentState = toAnalyze.pop()
-            if currentState is not None:
-                found = False
-                for tmpState in states:
-                        if tmpState.name == currentState.name:
-                            found = True
-                if not found:
-                    for transition in currentState.transitions:
-                        outputState = transition.output_state
-                        found = False
-                        for tmpState in states:
-                            if tmpState.name == outputState.name:
-                                found = True
-                        for tmpState in toAnalyze:
-                            if tmpState.name == outputState.name:
-                                found = True
-                        if not found:
-                            toAnalyze.append(outputState)
-                    states.append(currentState)
+            for transition in currentState.transitions:
+                outputState = transition.output_state
+                if outputState.name not in discoveredNames:
+                    discoveredNames.add(outputState.name)
+                    toAnalyze.append(outputState)
+            states.append(currentState)
         return states
 
+    @staticmethod
+    def create_from_tables(next_states, output_letters, input_letters, initial_state = 0, name = "Automata"):
+        """This static method returns the deterministic Automata described by its transition tables.
+        States are identified by their index and named after it. Given the index of an input letter
+        in input_letters, next_states[state][index] is the index of the state reached from the
+        state and output_letters[state][index] is the letter it emits.
+
+        >>> from pylstar.automata.Automata import Automata
+        >>> from pylstar.Letter import Letter
+        >>> la = Letter('A')
+        >>> lb = Letter('B')
+        >>> l0 = Letter(0)
+        >>> l1 = Letter(1)
+        >>> automata = Automata.create_from_tables([[0, 1], [1, 0]], [[l0, l1], [l0, l1]], [la, lb])
+        >>> print(automata.build_dot_code())
+        digraph "Automata" {
+        "0" [shape=doubleoctagon, style=filled, fillcolor=white, URL="0"];
+        "1" [shape=ellipse, style=filled, fillcolor=white, URL="1"];
+        "0" -> "0" [fontsize=5, label="A / 0", URL="t0"];
+        "0" -> "1" [fontsize=5, label="B / 1", URL="t1"];
+        "1" -> "1" [fontsize=5, label="A / 0", URL="t2"];
+        "1" -> "0" [fontsize=5, label="B / 1", URL="t3"];
+        }
+
+        """
+
+        if next_states is None:
+            raise Exception("Next states cannot be None")
+        if output_letters is None:
+            raise Exception("Output letters cannot be None")
+        if input_letters is None:
+            raise Exception("Input letters cannot be None")
+        if len(next_states) != len(output_letters):
+            raise Exception("Next states and output letters must describe the same states")
+
+        states = [State(name = str(i_state)) for i_state in range(len(next_states))]
+        i_transition = 0
+        for (state, state_next_states, state_output_letters) in zip(states, next_states, output_letters):
+            for (input_letter, next_state, output_letter) in zip(input_letters, state_next_states, state_output_letters):
+                state.transitions.append(Transition(name = "t{}".format(i_transition),
+                                                    output_state = states[next_state],
+                                                    input_letter = input_letter,
+                                                    output_letter = output_letter))
+                i_transition += 1
+
+        return Automata(initial_state = states[initial_state], name = name)
+
     @staticmethod
     def create_from_dot_code(dot_code):
         """This statis method returns the Automata object that can represents the provided DOT code
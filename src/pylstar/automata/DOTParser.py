@@ -206,8 +206,8 @@ class DOTParser(object):
             # parses input and output letters out of the label
             (input, output) = label.split('/')
 
-            input_letter = Letter(input.strip())
-            output_letter = Letter(output.strip())            
+            input_letter = Letter.get(input.strip())
+            output_letter = Letter.get(output.strip())            
 
             # parses the transition name (url)
             i_start_url = transition_details.find('URL=')
@@ -189,11 +189,38 @@ class RandomWalkMethod(object):
     """
     
 
-    def __init__(self, knowledge_base, input_letters, max_steps, restart_probability):
+    def __init__(self, knowledge_base, input_letters, max_steps, restart_probability, batch_size = 1):
         self.knowledge_base = knowledge_base
         self.input_letters = input_letters
         self.max_steps = max_steps
         self.restart_probability = restart_probability
+        self.batch_size = batch_size
+
+    @property
+    def batch_size(self):
+        """Number of random walks that are submitted together to the knowledge
+        base, which allows it to execute them concurrently. The first walk of
+        the batch that highlights a counterexample is returned.
+
+        >>> from pylstar.eqtests.RandomWalkMethod import RandomWalkMethod
+        >>> eqTests = RandomWalkMethod(None, [], 100, 0.5)
+        >>> print(eqTests.batch_size)
+        1
+        >>> eqTests.batch_size = 0
+        Traceback (most recent call last):
+        ...
+        Exception: Batch size must be > 0
+
+        """
+        return self.__batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        if batch_size is None:
+            raise Exception("Batch size cannot be None")
+        if int(batch_size) < 1:
+            raise Exception("Batch size must be > 0")
+        self.__batch_size = int(batch_size)
 
     def find_counterexample(self, hypothesis):
         if hypothesis is None:
@@ -209,6 +236,7 @@ class RandomWalkMethod(object):
         input_word = Word()
         hypothesis_output_word = Word()
         force_restart = False
+        pending_walks = []
         while i_step < self.max_steps:
 
             # should we restart
@@ -217,9 +245,12 @@ class RandomWalkMethod(object):
                     current_state = hypothesis.initial_state
                     first_step_after_restart = True
 
-                    counterexample_query = self.__check_equivalence(input_word, hypothesis_output_word)
-                    if counterexample_query is not None:
-                        return counterexample_query
+                    pending_walks.append((input_word, hypothesis_output_word))
+                    if len(pending_walks) >= self.batch_size:
+                        counterexample_query = self.__check_equivalence(pending_walks)
+                        if counterexample_query is not None:
+                            return counterexample_query
+                        pending_walks = []
                     
                     input_word = Word()
                     hypothesis_output_word = Word()
@@ -239,19 +270,24 @@ class RandomWalkMethod(object):
 
             i_step += 1
 
-    def __check_equivalence(self, input_word, expected_output_word):
-        if input_word is None:
-            raise Exception("Input word cannot be None")
-            
-        if expected_output_word is None:
-            raise Exception("Expected word cannot be None")
+        # the walks of the last incomplete batch and the current walk are also checked
+        if len(input_word.letters) > 0:
+            pending_walks.append((input_word, hypothesis_output_word))
+        if len(pending_walks) > 0:
+            return self.__check_equivalence(pending_walks)
+        return None
+
+    def __check_equivalence(self, walks):
+        if walks is None:
+            raise Exception("Walks cannot be None")
 
-        query = OutputQuery(input_word)
-        self.knowledge_base.resolve_query(query)
+        queries = [OutputQuery(input_word) for (input_word, expected_output_word) in walks]
+        self.knowledge_base.resolve_queries(queries)
 
-        if query.output_word != expected_output_word:
-            self._logger.info("Found a counter-example : input: '{}', expected: '{}', observed: '{}'".format(input_word, expected_output_word, query.output_word))
-            return query
+        for (query, (input_word, expected_output_word)) in zip(queries, walks):
+            if query.output_word != expected_output_word:
+                self._logger.info("Found a counter-example : input: '{}', expected: '{}', observed: '{}'".format(input_word, expected_output_word, query.output_word))
+                return query
         return None
 
     def __walk(self, current_state):
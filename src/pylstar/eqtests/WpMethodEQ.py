@@ -26,24 +26,95 @@
 # +----------------------------------------------------------------------------
 import itertools
 from collections import deque
+from collections import OrderedDict
 
 # +----------------------------------------------------------------------------
 # | pylstar Imports
 # +----------------------------------------------------------------------------
 from pylstar.tools.Decorators import PylstarLogger
 from pylstar.Word import Word
-from pylstar.Letter import EmptyLetter
+from pylstar.Letter import EMPTY_LETTER
 from pylstar.OutputQuery import OutputQuery
 
 
 @PylstarLogger
 class WpMethodEQ(object):
-    """WPmethod algorithm used to trigger an equivalence query"""
-
-    def __init__(self, knowledge_base, max_states, input_letters):
+    """WPmethod algorithm used to trigger an equivalence query.
+
+    States of the hypothesis are told apart by the shortest suffixes
+    computed with a partition refinement, so the cost of building the
+    characterization set stays polynomial in the number of states.
+
+    In the following example, the target counts the letters 'a' modulo 4
+    while the hypothesis counts them modulo 3, the shortest testcase that
+    highlights the difference is returned.
+
+    >>> from pylstar.automata.Automata import Automata
+    >>> from pylstar.FakeActiveKnowledgeBase import FakeActiveKnowledgeBase
+    >>> from pylstar.eqtests.WpMethodEQ import WpMethodEQ
+    >>> from pylstar.Letter import Letter
+    >>> def build_counter(modulo):
+    ...     dot_code = ['digraph "Counter" {']
+    ...     for i in range(modulo):
+    ...         dot_code.append('"C{0}" [shape=ellipse, style=filled, fillcolor=white, URL="C{0}"];'.format(i))
+    ...     for i in range(modulo):
+    ...         dot_code.append('"C{}" -> "C{}" [fontsize=5, label="a / {}", URL="a{}"];'.format(i, (i + 1) % modulo, int(i == modulo - 1), i))
+    ...         dot_code.append('"C{}" -> "C0" [fontsize=5, label="b / 0", URL="b{}"];'.format(i, i))
+    ...     dot_code.append('}')
+    ...     return Automata.create_from_dot_code("\\n".join(dot_code))
+    >>> kbase = FakeActiveKnowledgeBase(build_counter(4))
+    >>> eqtests = WpMethodEQ(kbase, 4, [Letter.get('a'), Letter.get('b')])
+    >>> print(eqtests.find_counterexample(build_counter(3)))
+    OutputQuery(I = [Letter('a'), Letter('a'), Letter('a')], O = [Letter('0'), Letter('0'), Letter('0')])
+    >>> print(eqtests.find_counterexample(build_counter(4)))
+    None
+
+    """
+
+    def __init__(self, knowledge_base, max_states, input_letters, max_testcases = None):
         self.knowledge_base = knowledge_base
         self.max_states = max_states
         self.input_letters = input_letters
+        self.max_testcases = max_testcases
+        self.__empty_word = Word([EMPTY_LETTER])
+        self.__nb_states = 0
+        self.__outputs = []
+        self.__successors = []
+
+    @property
+    def input_letters(self):
+        """Input letters used to build the testcases"""
+        return self.__input_letters
+
+    @input_letters.setter
+    def input_letters(self, input_letters):
+        if input_letters is None:
+            raise Exception("Input letters cannot be None")
+        self.__input_letters = input_letters
+
+    @property
+    def max_testcases(self):
+        """Maximum number of testcases in Z, or None if unbounded. When
+        extending W with one more letter would exceed it, the remaining
+        extensions are dropped and a warning is logged.
+
+        >>> from pylstar.eqtests.WpMethodEQ import WpMethodEQ
+        >>> eqtests = WpMethodEQ(None, 4, [])
+        >>> print(eqtests.max_testcases)
+        None
+        >>> eqtests.max_testcases = 0
+        Traceback (most recent call last):
+        ...
+        Exception: Max testcases must be > 0
+
+        """
+        return self.__max_testcases
+
+    @max_testcases.setter
+    def max_testcases(self, max_testcases):
+        if max_testcases is not None and int(max_testcases) < 1:
+            raise Exception("Max testcases must be > 0")
+        self.__max_testcases = max_testcases
 
     def find_counterexample(self, hypothesis):
         if hypothesis is None:
@@ -52,41 +123,62 @@ class WpMethodEQ(object):
         W = []
 
         states = hypothesis.get_states()
-        
-        # compute all couples of states
-        state_couples = itertools.combinations(states, 2)
-
-        # Constructing the characterization set W of the hypothesis
-        for couple in state_couples:
-            # Computes a distinguishing string for each couple of state
-            W.append(self.__compute_distinguishable_string(hypothesis, couple))
+        self.__nb_states = len(states)
+        self.__build_transition_table(states)
+
+        # Constructing the characterization set W of the hypothesis. Words of
+        # W, P and Z are tuples of indexes in input_letters, letters are only
+        # used once a testcase is submitted to the knowledge base
+        suffixes = self.__compute_distinguishing_suffixes(len(states))
+        if len(suffixes) < len(states) * (len(states) - 1) // 2:
+            self._logger.debug("Some states of the hypothesis cannot be distinguished")
+
+        # many couples share the same suffix, each one is kept once in the
+        # order of the first couple it distinguishes
+        seen_suffixes = set()
+        for couple in itertools.combinations(range(len(states)), 2):
+            suffix = suffixes.get(couple)
+            if suffix is not None and suffix not in seen_suffixes:
+                seen_suffixes.add(suffix)
+                W.append(suffix)
 
         # computes P
         P = self.__computesP(hypothesis)
-        self._logger.debug("P= {}".format(P))
+        self._logger.debug("P= %s", P)
 
         # computes Z
         Z = self.__computesZ(hypothesis, W)
-        self._logger.debug("Z= {}".format(Z))
+        self._logger.debug("Z= %s", Z)
 
         # T = P . Z
         T =  P + Z
-        self._logger.debug("T={}".format(T))
-
-        # check if one of the computed testcase highlights a counterexample
-        for i_testcase, testcase_query in enumerate(T[1:]):
-            self._logger.debug("Executing testcase {}/{} : {}".format(i_testcase, len(T)-1, testcase_query))
-
-            # computes the hypothesis output
-            hypothesis_output_word = hypothesis.play_query(testcase_query)[0]
-
-            self.knowledge_base.resolve_query(testcase_query)
-            real_output_word = testcase_query.output_word
-
-            self._logger.debug(real_output_word)
-            self._logger.debug(hypothesis_output_word)
-            if real_output_word != hypothesis_output_word:
-                return testcase_query
+        self._logger.debug("T=%s", T)
+
+        # shortest testcases are executed first so the returned counterexample
+        # is as short as possible and the search stops as soon as one is found
+        testcases = sorted(T[1:], key=len)
+
+        # testcases of the same length are resolved as a single batch so the
+        # knowledge base can submit them concurrently
+        i_testcase = 0
+        for (length, batch) in itertools.groupby(testcases, key=len):
+            batch = list(batch)
+            self._logger.debug("Executing testcases %d to %d/%d of length %d", i_testcase, i_testcase + len(batch), len(testcases), length)
+            i_testcase += len(batch)
+
+            batch_queries = [self.__create_query(testcase) for testcase in batch]
+            self.knowledge_base.resolve_queries(batch_queries)
+
+            # check if one of the computed testcase highlights a counterexample
+            for (testcase, testcase_query) in zip(batch, batch_queries):
+                # computes the hypothesis output
+                hypothesis_output_letters = self.__play_letters(0, testcase)
+                real_output_word = testcase_query.output_word
+
+                self._logger.debug(real_output_word)
+                self._logger.debug(hypothesis_output_letters)
+                if tuple(real_output_word.letters) != hypothesis_output_letters:
+                    return testcase_query
         return None
 
     def __computesZ(self, hypothesis, W):    
@@ -100,32 +192,34 @@ class WpMethodEQ(object):
             
         self._logger.debug("Computing Z")
 
+        # testcases are deduplicated according to their letter indexes
         Z = []
-        Z.extend(W)
+        seen_words = set()
+        X = []
+        for w in W:
+            if w not in seen_words:
+                seen_words.add(w)
+                Z.append(w)
+                X.append(w)
         
-        states = hypothesis.get_states()
-        v = self.max_states - len(states)
-        if v < 0:
-            v = 0
-        self._logger.debug("V= {}".format(v))
-
-        output_queries = []
-        for input_letter in self.input_letters:
-            output_query = OutputQuery(word = Word([input_letter]))
-            output_queries.append(output_query)
-
-        X = dict()
-        X[0] = W
+        v = self.max_states - self.__nb_states
+        self._logger.debug("V= %s", v)
+        if v <= 0:
+            # the hypothesis already has the maximum number of states, Z = W
+            return Z
+
+        letter_indexes = range(len(self.input_letters))
+        max_testcases = self.max_testcases
         for i in range(1, v+1):
-            self._logger.debug("Computing X^{}".format(i))
-            X[i] = []
-            previous_X = X[i-1]
-            for x in previous_X:
-                X[i].extend(x.multiply(output_queries))
-            for w in W:
-                for xi in X[i]:
-                    if not xi in Z:
-                        Z.append(xi)
+            if max_testcases is not None and len(Z) + len(X) * len(letter_indexes) > max_testcases:
+                self._logger.warning("Z is limited to X^{} since X^{} would exceed {} testcases".format(i - 1, i, max_testcases))
+                break
+            self._logger.debug("Computing X^%d", i)
+            X = [x + (i_letter, ) for x in X for i_letter in letter_indexes]
+            for xi in X:
+                if xi not in seen_words:
+                    seen_words.add(xi)
+                    Z.append(xi)
 
         return Z
 
@@ -134,84 +228,171 @@ class WpMethodEQ(object):
             raise Exception("Hypothesis cannot be None")
         self._logger.debug("Computing P")
 
-        P = []
-            
-        empty_word = Word([EmptyLetter()])
-        current_query = OutputQuery(empty_word)
-        P.append(current_query)
+        P = [()]
 
-        open_queries = deque([current_query])
-        close_queries = []
+        # prefixes are kept as tuples of letter indexes along with the state they reach
+        open_prefixes = deque([((), 0)])
+        close_prefixes = []
 
-        seen_states = set([hypothesis.initial_state])
-        while len(open_queries) > 0:
-            query = open_queries.popleft()
-            tmp_seen_states = set()
+        letter_indexes = range(len(self.input_letters))
+        successors = self.__successors
 
-            for letter in self.input_letters:
-                new_word = query.input_word + Word([letter])
-                query_z = OutputQuery(new_word)
-                (output_word, visited_states) = hypothesis.play_query(query_z)
-                close_queries.append(query_z)
-                
-                if visited_states[-1] not in seen_states:
-                    tmp_seen_states.add(visited_states[-1])
-                    open_queries.append(query_z)
+        # a state is marked as seen as soon as it is enqueued, so each state is
+        # expanded once from its shortest access sequence
+        seen_states = [False] * len(successors)
+        seen_states[0] = True
+        while len(open_prefixes) > 0:
+            (prefix, state) = open_prefixes.popleft()
+            state_successors = successors[state]
 
-            seen_states.update(tmp_seen_states)
+            for i_letter in letter_indexes:
+                new_prefix = prefix + (i_letter, )
+                output_state = state_successors[i_letter]
+                close_prefixes.append(new_prefix)
+                
+                if not seen_states[output_state]:
+                    seen_states[output_state] = True
+                    open_prefixes.append((new_prefix, output_state))
 
-        P.extend(close_queries)
+        P.extend(close_prefixes)
 
         return P
         
-    def __compute_distinguishable_string(self, hypothesis, couple):
-        self._logger.debug("Computes the distinguishable string for state couple '{}'".format(couple))
-        if hypothesis is None:
-            raise Exception("Hypothesis cannot be None")
-        if couple is None:
-            raise Exception("couple cannot be None")
-            
-        self._logger.debug("Computing distinguishing strings for states {}".format(couple))
-        queries_to_test = deque([])
-        
-        empty_word = Word([EmptyLetter()])
-        z_query = OutputQuery(empty_word)
-        for letter in self.input_letters:
-            new_word = z_query.input_word + Word([letter])
-            queries_to_test.append(OutputQuery(new_word))
-
-        distinguishable_query = z_query
-
-        done = False
-        i = 0
-        while not done:
-            query = queries_to_test.popleft()
-            if i > self.max_states * self.max_states:
+    def __build_transition_table(self, states):
+        """Encodes the transitions of the specified states, the first one
+        being the initial state, in tables indexed by the index of the
+        state and the index of the input letter."""
+
+        state_indexes = dict((id(state), i_state) for (i_state, state) in enumerate(states))
+        self.__outputs = []
+        self.__successors = []
+        for state in states:
+            state_outputs = []
+            state_successors = []
+            for letter in self.input_letters:
+                (output_letter, output_state) = state.visit(letter)
+                state_outputs.append(output_letter)
+                state_successors.append(state_indexes[id(output_state)])
+            self.__outputs.append(state_outputs)
+            self.__successors.append(state_successors)
+
+    def __compute_distinguishing_suffixes(self, nb_states):
+        """Computes a shortest distinguishing suffix for every couple of
+        states with a single Moore partition refinement. States are
+        first split by the output they produce on each input letter,
+        then blocks are refined according to the blocks their successors
+        belong to. When two states end up in different blocks, the
+        letter that separated them followed by the suffix of their
+        successors distinguishes them.
+
+        It returns a dict that maps a couple of state indexes (i, j),
+        with i < j, to a tuple of letter indexes.
+        """
+        self._logger.debug("Computing distinguishing suffixes for %d states", nb_states)
+
+        successors = self.__successors
+        first_difference = self.__first_difference
+        suffixes = dict()
+
+        # the signature of a state packs one value per input letter in
+        # fixed-width bit fields, so the first letter on which two states
+        # differ is given by the lowest set bit of their xor
+        output_ids = dict()
+        output_values = [[output_ids.setdefault(output_letter, len(output_ids)) for output_letter in state_outputs] for state_outputs in self.__outputs]
+        width = len(output_ids).bit_length()
+        signatures = [self.__pack(values, width) for values in output_values]
+
+        # initial partition: states that produce the same outputs
+        blocks = self.__partition(range(nb_states), signatures)
+        for (i, j) in self.__split_couples([blocks]):
+            i_letter = first_difference(signatures[i], signatures[j], width)
+            suffixes[(i, j)] = (i_letter, )
+
+        # refine blocks according to the blocks of the successors
+        while True:
+            block_of = [0] * nb_states
+            for (i_block, block) in enumerate(blocks):
+                for i_state in block:
+                    block_of[i_state] = i_block
+
+            width = len(blocks).bit_length()
+            signatures = [self.__pack([block_of[i_succ] for i_succ in state_successors], width) for state_successors in successors]
+
+            new_blocks = []
+            split_blocks = []
+            for block in blocks:
+                groups = self.__partition(block, signatures)
+                new_blocks.extend(groups)
+                if len(groups) > 1:
+                    split_blocks.append(groups)
+
+            if len(split_blocks) == 0:
                 break
 
-            if not self.__is_distinguishable_states(hypothesis, query, couple):
-                done = False
-                for letter in self.input_letters:
-                    new_query = OutputQuery(query.input_word + Word([letter]))
-                    queries_to_test.append(new_query)
-            else:
-                done = True
-                distinguishable_query = query
-
-            i = i + 1
-
-        return distinguishable_query
-        
-    def __is_distinguishable_states(self, hypothesis, query, couple):
-        if hypothesis is None:
-            raise Exception("Hypothesis cannot be None")
-        if query is None:
-            raise Exception("query cannot be None")
-        if couple is None:
-            raise Exception("couple cannot be None")
-
-        output_word_state0 = hypothesis.play_word(query.input_word, couple[0])[0]
-        output_word_state1 = hypothesis.play_word(query.input_word, couple[1])[0]
-        
-        return output_word_state0 != output_word_state1
-
+            for (i, j) in self.__split_couples(split_blocks):
+                i_letter = first_difference(signatures[i], signatures[j], width)
+                succ_i = successors[i][i_letter]
+                succ_j = successors[j][i_letter]
+                suffixes[(i, j)] = (i_letter, ) + suffixes[(min(succ_i, succ_j), max(succ_i, succ_j))]
+            blocks = new_blocks
+
+        return suffixes
+
+    def __pack(self, values, width):
+        """Packs the specified values in bit fields of the given width,
+        the first value taking the lowest bits"""
+        signature = 0
+        for (i_value, value) in enumerate(values):
+            signature |= value << (i_value * width)
+        return signature
+
+    def __first_difference(self, signature0, signature1, width):
+        """Returns the index of the first field that differs between two
+        signatures packed with the given width"""
+        diff = signature0 ^ signature1
+        return ((diff & -diff).bit_length() - 1) // width
+
+    def __partition(self, block, signatures):
+        """Splits the specified block according to the signatures of its states"""
+        groups = OrderedDict()
+        for i_state in block:
+            groups.setdefault(signatures[i_state], []).append(i_state)
+        return list(groups.values())
+
+    def __split_couples(self, split_blocks):
+        """Yields the couples (i, j), with i < j, of states that belonged to
+        the same block and that are now in different groups. Each split
+        block is given as the list of its groups, so couples are built
+        across groups without testing the ones that stay together."""
+        for groups in split_blocks:
+            for (group0, group1) in itertools.combinations(groups, 2):
+                for i in group0:
+                    for j in group1:
+                        if i < j:
+                            yield (i, j)
+                        else:
+                            yield (j, i)
+
+    def __create_query(self, letter_indexes):
+        """Creates the output query of the specified tuple of letter
+        indexes, an empty tuple being the empty word"""
+        if len(letter_indexes) == 0:
+            return OutputQuery(self.__empty_word)
+        input_letters = self.input_letters
+        return OutputQuery(Word([input_letters[i_letter] for i_letter in letter_indexes]))
+
+    def __play_letters(self, state, letter_indexes):
+        """Returns the output letters the hypothesis produces when the
+        letters of the specified indexes are played from the state of the
+        given index. Walking the transition tables costs a lookup per letter."""
+
+        outputs = self.__outputs
+        successors = self.__successors
+
+        output_letters = []
+        current_state = state
+        for i_letter in letter_indexes:
+            output_letters.append(outputs[current_state][i_letter])
+            current_state = successors[current_state][i_letter]
+
+        return tuple(output_letters)
@@ -112,17 +112,26 @@ def PylstarLogger(klass):
     # Exclude logger from __getstate__
     def getState(self, **kwargs):
         r = dict()
-        for k, v in self.__dict__.items():
+        for k, v in getattr(self, '__dict__', dict()).items():
             if not isinstance(v, logging.Logger):
                 r[k] = v
+        # Attributes stored in slots are not part of the __dict__
+        for cls in type(self).__mro__:
+            for k in cls.__dict__.get('__slots__', ()):
+                if k.startswith('__') and not k.endswith('__'):
+                    k = '_{}{}'.format(cls.__name__.lstrip('_'), k)
+                if hasattr(self, k) and not isinstance(getattr(self, k), logging.Logger):
+                    r[k] = getattr(self, k)
         return r
 
     def setState(self, dict):
-        self.__dict__ = dict
-        self.__logger = logging.getLogger(klass.__name__)
+        for k, v in dict.items():
+            setattr(self, k, v)
 
-    klass.__getstate__ = getState
-    klass.__setState__ = setState
+    # Keep the state methods defined by the class or inherited from a parent class
+    if not any('__getstate__' in k.__dict__ for k in klass.__mro__ if k is not object):
+        klass.__getstate__ = getState
+        klass.__setstate__ = setState
 
     return klass
 
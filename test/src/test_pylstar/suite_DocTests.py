@@ -36,12 +36,16 @@ from pylstar import Word
 from pylstar import OutputQuery
 from pylstar import KnowledgeBase
 from pylstar import KnowledgeTree
+from pylstar import KnowledgeBaseStats
 from pylstar import ActiveKnowledgeBase
 from pylstar import FakeActiveKnowledgeBase
+from pylstar import NetworkActiveKnowledgeBase
+from pylstar import NetworkConnectionPool
 from pylstar.automata import Automata
 from pylstar.automata import DOTParser
 from pylstar import Letter
 from pylstar.eqtests import RandomWalkMethod
+from pylstar.eqtests import WpMethodEQ
 from pylstar.automata import State
 
 
@@ -54,11 +58,15 @@ def getSuite():
         OutputQuery,
         KnowledgeBase,
         KnowledgeTree,
+        KnowledgeBaseStats,
         ActiveKnowledgeBase,
         FakeActiveKnowledgeBase,
+        NetworkActiveKnowledgeBase,
+        NetworkConnectionPool,
         Automata,
         Letter,
         RandomWalkMethod,
+        WpMethodEQ,
         State,
         DOTParser
     ]